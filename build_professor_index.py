@@ -0,0 +1,78 @@
+import argparse
+import os
+from typing import Dict, Tuple
+from dotenv import load_dotenv
+
+from src.data.catalog import get_catalog
+from src.data.rmp import RMPSearcher
+from src.data.professor_index import get_professor_index, normalize_name, profile_from_rmp_data
+from src.engine.judge import get_judge
+from src.engine.concurrency import run_concurrently
+
+load_dotenv()
+
+PLACEHOLDERS = {"", "tbd", "tba", "staff"}
+
+
+def collect_instructors(catalog_path: str, include_vector_store: bool = True) -> Dict[str, Tuple[str, str]]:
+    """
+    Returns {normalized name: (display name, school)} for every instructor in the
+    JSON catalog and (optionally) the Chroma collection.
+    """
+    catalog = get_catalog(catalog_path)
+    instructors = {key: (name, catalog.by_instructor(key)[0].school) for key, name in catalog.instructors().items()}
+
+    if include_vector_store:
+        try:
+            from src.vector_store.store import CourseVectorStore
+            metadatas = CourseVectorStore().collection.get(include=["metadatas"])["metadatas"]
+            for meta in metadatas:
+                name = (meta or {}).get("instructor", "")
+                instructors.setdefault(normalize_name(name), (name, meta.get("school", "")))
+        except Exception as e:
+            print(f"⚠️ Skipping vector store instructors: {e}")
+
+    return {k: v for k, v in instructors.items() if k not in PLACEHOLDERS}
+
+
+def build_index(catalog_path: str, school: str = "NYU", max_workers: int = 4, force: bool = False, include_vector_store: bool = True):
+    index = get_professor_index()
+    instructors = collect_instructors(catalog_path, include_vector_store)
+    # Only go to the network for unknown or stale professors
+    todo = [v for k, v in instructors.items() if force or index.get(k) is None]
+    print(f"👩‍🏫 {len(instructors)} instructors found, {len(todo)} to fetch ({len(instructors) - len(todo)} fresh in index).")
+
+    searcher = RMPSearcher()
+    judge = get_judge(os.getenv("GOOGLE_API_KEY"))
+
+    def _fetch(item, status):
+        # Search at the instructor's own school; --school only fills in for records without one
+        display_name, instructor_school = item
+        instructor_school = instructor_school or school
+        content = searcher.search_professor(display_name, instructor_school)
+        return profile_from_rmp_data(display_name, instructor_school, judge.extract_rmp_data(content, professor=display_name))
+
+    done = 0
+    for event, idx, payload in run_concurrently(todo, _fetch, max_workers=max_workers):
+        if event == "status":
+            continue
+        done += 1
+        name = todo[idx][0]
+        if event == "error":
+            print(f"[{done}/{len(todo)}] ❌ {name}: {payload}")
+            continue
+        index.upsert(payload)
+        print(f"[{done}/{len(todo)}] ✅ {name}: rating={payload.rating} difficulty={payload.difficulty}")
+
+    print(f"📇 Professor index now holds {len(index)} profiles ({index.path}).")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute RMP professor profiles into the local professor index.")
+    parser.add_argument("--catalog", default="src/data/courses.json", help="JSON course catalog to read instructors from")
+    parser.add_argument("--school", default="NYU", help="School used in RMP searches for instructors whose records have no school")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel lookups")
+    parser.add_argument("--force", action="store_true", help="Refresh every professor, even fresh ones")
+    parser.add_argument("--no-vector-store", action="store_true", help="Only read instructors from the catalog file")
+    args = parser.parse_args()
+    build_index(args.catalog, args.school, args.workers, args.force, not args.no_vector_store)
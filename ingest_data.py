@@ -1,119 +1,247 @@
+import argparse
+import asyncio
+import json
 import os
-import time
-import traceback
-from typing import Optional
-from tavily import TavilyClient
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
 from dotenv import load_dotenv
-import google.generativeai as genai
-from google.api_core import exceptions
+
+from src.data.cache import CACHE_DIR
+from src.data.fetcher import StreamingJSONFetcher
+from src.data.models import Course, model_to_dict
+from src.data.processor import DocumentProcessor
+from src.data.professor_index import get_professor_index, normalize_name
+from src.data.rmp import AsyncRMPSearcher, RMPAggregator, RMPSearcher
+from src.engine.concurrency import is_quota_error, limiter_stats, run_concurrently
+from src.engine.rmp_extractor import RMP_CONFIDENCE_THRESHOLD, extract_rmp_stats
 
 load_dotenv()
 
-class RMPSearcher:
-    def __init__(self):
-        # 确保这里 api_key 读取正确，如果报错可以手动填入测试
-        self.tavily = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
-
-    def search_professor(self, professor_name: str, school: str) -> str:
-        """
-        Searches for Rate My Professor page content for a given professor.
-        """
-        query = f"{professor_name} {school} Rate My Professors"
-        try:
-            response = self.tavily.search(query=query, search_depth="advanced", max_results=1)
-            if not response.get('results'):
-                return ""
-            return response['results'][0]['content']
-        except Exception as e:
-            print(f"Error searching RMP for {professor_name}: {e}")
-            return ""
-
-    def search_reddit(self, course_code: str) -> str:
-        """
-        Searches Reddit for course reviews and workload discussions.
-        """
-        query = f"{course_code} NYU Tandon reddit workload review"
-        try:
-            response = self.tavily.search(query=query, search_depth="advanced", max_results=2)
-            if not response.get('results'):
-                return ""
-            
-            combined_content = "\n\n".join([res['content'] for res in response['results']])
-            return combined_content
-        except Exception as e:
-            print(f"Error searching Reddit for {course_code}: {e}")
-            return ""
-
-class RMPAggregator:
-    def __init__(self):
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-        
-        # --- 修改点 1: 移除复杂的测试回退逻辑，直接锁定最稳定的模型 ---
-        self.model_name = 'gemini-1.5-flash'
-        self.model = genai.GenerativeModel(self.model_name)
-        print(f"✅ RMPAggregator initialized with {self.model_name}")
-
-    def summarize_reviews(self, professor_name: str, search_content: str) -> dict:
-        if not search_content:
-            return {"rating": 0.0, "summary": "No reviews found."}
-            
-        prompt = f"""
-        You are an assistant summarizing professor reviews for a student.
-        
-        Based on the following search results from Rate My Professors (or similar sites), 
-        provide a concise summary of the professor's teaching style, difficulty, and overall quality.
-        Also, extract a numerical rating (0-5) if available, otherwise estimate it based on sentiment.
-        
-        Search Content:
-        {search_content}
-        
-        Output Format:
-        Rating: [0-5]/5
-        Summary: [2-3 sentences summary]
-        """
-        
-        # --- 修改点 2: 增加自动重试机制 (Retry Logic) ---
-        max_retries = 3
-        base_wait_time = 5  # 基础等待时间 5 秒
-
-        for attempt in range(max_retries):
-            try:
-                response = self.model.generate_content(prompt)
-                result = response.text.strip()
-                
-                # Simple parsing
-                lines = result.split('\n')
-                rating = 0.0
-                summary = result
-                
-                for line in lines:
-                    if line.startswith("Rating:"):
-                        try:
-                            rating_str = line.split(":")[1].strip().split("/")[0]
-                            # 清理可能出现的非数字字符
-                            clean_rating = ''.join(filter(lambda x: x.isdigit() or x == '.', rating_str))
-                            rating = float(clean_rating)
-                        except:
-                            pass
-                    elif line.startswith("Summary:"):
-                        try:
-                            summary = line.split(":", 1)[1].strip()
-                        except:
-                            pass
-                
-                return {"rating": rating, "summary": summary}
-
-            except exceptions.ResourceExhausted:
-                # 专门捕获 429 配额超限错误
-                wait_time = base_wait_time * (2 ** attempt) # 5s, 10s, 20s...
-                print(f"\n⏳ 配额超限 (429)。正在等待 {wait_time} 秒后重试 (尝试 {attempt+1}/{max_retries})...")
-                time.sleep(wait_time)
-            
-            except Exception as e:
-                print(f"\n⚠️ 生成时发生未知错误: {e}")
-                traceback.print_exc()
-                break # 其他错误通常重试也没用，直接跳出
-        
-        # 如果重试多次还是失败，返回默认空值，防止程序崩溃
-        print(f"❌ 无法处理教授 {professor_name} 的数据，跳过。")
-        return {"rating": 0.0, "summary": "Error retrieving summary."}
\ No newline at end of file
+PLACEHOLDERS = {"", "tbd", "tba", "staff"}
+DEFAULT_CHECKPOINT = os.path.join(CACHE_DIR, "ingest_checkpoint.json")
+
+
+def course_key(course: Course) -> str:
+    return f"{course.course_id}|{course.term}|{normalize_name(course.instructor)}"
+
+
+class Checkpoint:
+    """
+    Progress of one ingestion run: how many catalog records are consumed, how many bytes
+    of the output file are written, and the courses that failed (retried on the next run).
+    Its size does not grow with the catalog, only with failures. Saved atomically after
+    every batch, so a crash or quota exhaustion resumes from the last completed batch.
+    """
+    def __init__(self, path: str, catalog: str, output: str):
+        self.path = path
+        self.catalog = os.path.abspath(catalog)
+        self.output = os.path.abspath(output)
+        self.position = 0
+        self.output_offset = 0
+        self.written = 0
+        # Failed courses from the previous run, not yet retried; and failures of this run
+        self.retry: List[Dict[str, Any]] = []
+        self.failed: List[Dict[str, Any]] = []
+
+    @classmethod
+    def load(cls, path: str, catalog: str, output: str) -> "Checkpoint":
+        checkpoint = cls(path, catalog, output)
+        if not os.path.exists(path):
+            return checkpoint
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("catalog") != checkpoint.catalog or data.get("output") != checkpoint.output:
+            raise SystemExit(f"❌ Checkpoint {path} belongs to another run ({data.get('catalog')} -> {data.get('output')}). Use --reset to start over.")
+        if "position" not in data:
+            raise SystemExit(f"❌ Checkpoint {path} has an old format. Use --reset to start over.")
+        checkpoint.position = int(data["position"])
+        checkpoint.output_offset = int(data.get("output_offset", 0))
+        checkpoint.written = int(data.get("written", 0))
+        checkpoint.retry = list(data.get("failed", []))
+        return checkpoint
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "catalog": self.catalog,
+                "output": self.output,
+                "position": self.position,
+                "output_offset": self.output_offset,
+                "written": self.written,
+                "failed": self.retry + self.failed,
+            }, f)
+        os.replace(tmp_path, self.path)
+
+
+class CourseEnricher:
+    """
+    Adds RMP rating, review count and a review summary to a Course. Without a readable
+    RMP rating, the summarizer's estimate is stored as review_rating instead.
+    Professors already in the professor index skip the RMP search; the RMP and Reddit
+    lookups for a course run concurrently. Errors are raised, never swallowed, so a
+    failed course is retried on the next run instead of being written without data.
+    """
+    def __init__(self, school: str = "NYU"):
+        self.school = school
+        self.searcher = AsyncRMPSearcher(RMPSearcher(strict=True))
+        self.aggregator = RMPAggregator()
+        self.index = get_professor_index()
+
+    def enrich(self, course: Course) -> Course:
+        professor = None if normalize_name(course.instructor) in PLACEHOLDERS else course.instructor
+        profile = self.index.get(professor) if professor else None
+        # Index entries recorded without RMP data still get a live search
+        profile = profile if profile and profile.has_data else None
+
+        rmp_content, reddit_content = asyncio.run(
+            self.searcher.search_course(None if profile else professor, course.course_id, self.school)
+        )
+
+        sections = []
+        if profile and profile.summary:
+            sections.append(f"Rate My Professors summary:\n{profile.summary}")
+        if rmp_content:
+            sections.append(f"Rate My Professors:\n{rmp_content}")
+        if reddit_content:
+            sections.append(f"Reddit discussions about {course.course_id}:\n{reddit_content}")
+        review = self.aggregator.summarize_reviews(professor or course.course_id, "\n\n".join(sections), strict=True)
+
+        # rmp_rating only ever holds a number read from RMP; the summarizer's estimate goes to review_rating
+        enriched = model_to_dict(course)
+        stats = extract_rmp_stats(rmp_content) if rmp_content else None
+        if profile:
+            enriched["rmp_rating"] = profile.rating
+            enriched["rmp_num_ratings"] = profile.num_ratings
+            enriched["rating_source"] = "rmp"
+        elif stats and stats["has_data"] and stats["confidence"] >= RMP_CONFIDENCE_THRESHOLD:
+            enriched["rmp_rating"] = stats["rmp_rating"]
+            enriched["rmp_num_ratings"] = stats["review_count"] or None
+            enriched["rating_source"] = "rmp"
+        elif sections and review["rating"]:
+            enriched["review_rating"] = review["rating"]
+            enriched["rating_source"] = "reviews" if rmp_content else "reddit"
+        enriched["rmp_summary"] = review["summary"] if sections else None
+        return Course(**enriched)
+
+
+def write_batch(output_path: str, courses: List[Course], failed: List[Course], position: int, checkpoint: Checkpoint):
+    """
+    Appends one batch to the JSONL output, then records it (and its failures) in the checkpoint.
+    """
+    with open(output_path, "a", encoding="utf-8") as f:
+        for course in courses:
+            f.write(json.dumps(model_to_dict(course), ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+        checkpoint.output_offset = f.tell()
+    checkpoint.position = position
+    checkpoint.written += len(courses)
+    checkpoint.failed.extend(model_to_dict(c) for c in failed)
+    checkpoint.save()
+
+
+def pending_batches(fetcher: StreamingJSONFetcher, checkpoint: Checkpoint, batch_size: int, limit: Optional[int] = None) -> Iterator[Tuple[List[Course], int]]:
+    """
+    Yields (batch, position): first the courses that failed last run, then the catalog from the
+    checkpointed position on. position is the record count to checkpoint once the batch is written.
+    Only one batch is held in memory at a time; duplicates are dropped within a batch.
+    """
+    taken = 0
+    while checkpoint.retry and (limit is None or taken < limit):
+        size = batch_size if limit is None else min(batch_size, limit - taken)
+        batch = [Course(**record) for record in checkpoint.retry[:size]]
+        del checkpoint.retry[:size]
+        taken += len(batch)
+        yield batch, checkpoint.position
+
+    seen: Set[str] = set()
+    batch: List[Course] = []
+    if limit is not None and taken >= limit:
+        return
+    for course in fetcher.iter_courses(start=checkpoint.position):
+        key = course_key(course)
+        if key in seen:
+            continue
+        seen.add(key)
+        batch.append(course)
+        taken += 1
+        if len(batch) >= batch_size:
+            yield batch, fetcher.position
+            batch, seen = [], set()
+        # Stop before reading further, so the checkpointed position covers only what was taken
+        if limit is not None and taken >= limit:
+            break
+    if batch:
+        yield batch, fetcher.position
+
+
+def ingest(catalog_path: str, output_path: str, checkpoint_path: str = DEFAULT_CHECKPOINT, school: str = "NYU",
+           max_workers: int = 4, batch_size: int = 25, limit: Optional[int] = None, reset: bool = False,
+           vector_store: bool = False) -> Dict[str, Any]:
+    if reset:
+        for path in (checkpoint_path, output_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    checkpoint = Checkpoint.load(checkpoint_path, catalog_path, output_path)
+    # Drop anything written after the last checkpoint (a batch interrupted mid-write)
+    if os.path.exists(output_path):
+        with open(output_path, "a", encoding="utf-8") as f:
+            f.truncate(checkpoint.output_offset)
+
+    print(f"📚 Streaming {catalog_path} from record {checkpoint.position} ({checkpoint.written} courses already enriched, {len(checkpoint.retry)} to retry).")
+    fetcher = StreamingJSONFetcher(catalog_path)
+    enricher = CourseEnricher(school)
+    store = None
+    if vector_store:
+        from src.vector_store.store import CourseVectorStore
+        store = CourseVectorStore()
+    stats = {"written": 0, "failed": 0, "stopped": False}
+
+    for batch_number, (batch, position) in enumerate(pending_batches(fetcher, checkpoint, batch_size, limit), start=1):
+        results: Dict[int, Course] = {}
+        for event, idx, payload in run_concurrently(batch, lambda course, status: enricher.enrich(course), max_workers=max_workers):
+            if event == "done":
+                results[idx] = payload
+            elif event == "error":
+                stats["failed"] += 1
+                print(f"❌ {batch[idx].course_id} ({batch[idx].instructor}): {payload}")
+                if is_quota_error(payload):
+                    stats["stopped"] = True
+
+        enriched = [results[i] for i in sorted(results)]
+        failed = [course for i, course in enumerate(batch) if i not in results]
+        if enriched and store is not None:
+            # Unchanged documents are skipped by content hash, so re-runs don't re-embed
+            for documents, metadatas, ids in DocumentProcessor.iter_batches(enriched):
+                store.add_courses(documents, metadatas, ids)
+        write_batch(output_path, enriched, failed, position, checkpoint)
+        stats["written"] += len(enriched)
+        print(f"💾 Batch {batch_number}: saved {len(enriched)}/{len(batch)} ({checkpoint.written} enriched so far). Throttled: {limiter_stats()['throttled']}")
+
+        if stats["stopped"]:
+            print("⏸️ Quota exhausted. Progress is saved; run the same command again to resume.")
+            break
+
+    if fetcher.skipped:
+        print(f"⚠️ Skipped {fetcher.skipped} invalid records in {catalog_path}.")
+    print(f"✅ Wrote {stats['written']} courses to {output_path} ({stats['failed']} failed, retried on the next run).")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Enrich a course catalog with RMP and Reddit reviews. Resumable.")
+    parser.add_argument("--catalog", default="src/data/courses.json", help="Course catalog to enrich (JSON array or JSON Lines)")
+    parser.add_argument("--output", default="src/data/courses_enriched.jsonl", help="JSONL file enriched courses are appended to")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="Progress file used to resume")
+    parser.add_argument("--school", default="NYU", help="School name used in RMP searches")
+    parser.add_argument("--workers", type=int, default=4, help="Courses enriched in parallel")
+    parser.add_argument("--batch-size", type=int, default=25, help="Courses written per checkpoint")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many courses (e.g. to fit a quota window)")
+    parser.add_argument("--reset", action="store_true", help="Delete the checkpoint and output and start from zero")
+    parser.add_argument("--vector-store", action="store_true", help="Also upsert each enriched batch into the Chroma vector store")
+    args = parser.parse_args()
+    ingest(args.catalog, args.output, args.checkpoint, args.school, args.workers, args.batch_size, args.limit, args.reset, args.vector_store)
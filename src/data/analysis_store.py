@@ -0,0 +1,65 @@
+import hashlib
+import json
+import os
+from typing import MutableMapping, Optional
+
+from src.data.cache import SQLiteCache, get_cache, make_key
+from src.data.professor_index import normalize_name
+
+# Analyses are built from RMP / Reddit searches, so they go stale on the same scale as those (see SOURCE_TTLS).
+ANALYSIS_RESULT_TTL = int(os.getenv("ANALYSIS_RESULT_TTL", str(3 * 24 * 3600)))
+# Bump when the analysis prompt or JSON schema changes; older results are then never read again.
+ANALYSIS_VERSION = 3
+
+
+def requirements_hash(req_context: Optional[str]) -> str:
+    return hashlib.sha256(" ".join((req_context or "").split()).encode("utf-8")).hexdigest()[:16]
+
+
+def is_error_result(result_json: str) -> bool:
+    try:
+        data = json.loads(result_json)
+    except (TypeError, ValueError):
+        return False
+    return isinstance(data, dict) and "error" in data
+
+
+class AnalysisResultStore:
+    """
+    Rendered analysis JSON keyed by (school, course code, professor, goal, requirements hash).
+    Two tiers: the session's own dict (survives Streamlit reruns), backed by a SQLite cache
+    shared by every session.
+
+    Invalidation: entries expire after ANALYSIS_RESULT_TTL, ANALYSIS_VERSION is part of the key,
+    errors are never stored, and invalidate() drops a single entry (e.g. "re-analyze").
+    """
+    def __init__(self, session: MutableMapping[str, str], backing: Optional[SQLiteCache] = None, ttl: int = ANALYSIS_RESULT_TTL):
+        self.session = session
+        self.backing = backing or get_cache("analysis")
+        self.ttl = ttl
+
+    @staticmethod
+    def key(school: Optional[str], course_code: str, professor: str, goal: Optional[str], req_context: Optional[str]) -> str:
+        # School is part of the key: same-code courses with a placeholder professor ("TBD") or the same
+        # fallback requirements text would otherwise share results across schools
+        code = " ".join((course_code or "").upper().split())
+        school_key = " ".join((school or "").lower().split())
+        return make_key("analysis", ANALYSIS_VERSION, school_key, code, normalize_name(professor or ""), goal or "General", requirements_hash(req_context))
+
+    def get(self, key: str) -> Optional[str]:
+        result = self.session.get(key)
+        if result is None:
+            result = self.backing.get(key)
+            if result is not None:
+                self.session[key] = result
+        return result
+
+    def put(self, key: str, result_json: str):
+        if not result_json or is_error_result(result_json):
+            return
+        self.session[key] = result_json
+        self.backing.set(key, result_json, self.ttl)
+
+    def invalidate(self, key: str):
+        self.session.pop(key, None)
+        self.backing.delete(key)
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# All on-disk caches live here (relative to the working directory, like ./chroma_db).
+CACHE_DIR = os.getenv("COURSE_PILOT_CACHE_DIR", ".cache")
+
+
+def make_key(*parts: Any) -> str:
+    """
+    Builds a stable content-addressed key from JSON-serializable parts.
+    """
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SQLiteCache:
+    """
+    Persistent key/value cache with per-entry TTL and size-bounded LRU eviction.
+    Values must be JSON-serializable. Safe to share between threads.
+    """
+    def __init__(self, path: str, max_entries: int = 5000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Returns the cached value, or None on a miss or an expired entry.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at < now:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(value)
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        """
+        Stores a value. ttl_seconds=None keeps it until it is evicted.
+        """
+        now = time.time()
+        expires_at = now + ttl_seconds if ttl_seconds else None
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, payload, expires_at, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def _evict(self):
+        # Caller holds the lock. Expired rows go first, then least recently used ones.
+        self._conn.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY last_access ASC LIMIT ?)",
+                (overflow,)
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": size,
+            "max_entries": self.max_entries,
+        }
+
+
+_caches: Dict[str, SQLiteCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name: str, max_entries: int = 5000) -> SQLiteCache:
+    """
+    Returns the process-wide SQLiteCache stored at CACHE_DIR/<name>.sqlite3.
+    """
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = SQLiteCache(os.path.join(CACHE_DIR, f"{name}.sqlite3"), max_entries=max_entries)
+        return _caches[name]
@@ -0,0 +1,182 @@
+import json
+import os
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.data.models import Course
+from src.data.professor_index import normalize_name
+
+DEFAULT_CATALOG_PATH = os.getenv("COURSE_CATALOG_PATH", "src/data/courses.json")
+
+COURSE_FIELDS = tuple(Course.model_fields if hasattr(Course, "model_fields") else Course.__fields__)
+
+# Instructor placeholders (normalized) that mean "not announced yet"
+PLACEHOLDER_INSTRUCTORS = {"", "tbd", "tba", "staff"}
+
+# Parser / UI dicts use short keys ({"code", "professor"}); map them onto Course fields
+PARSED_FIELDS = {"code": "course_id", "professor": "instructor"}
+
+DEPARTMENT_RE = re.compile(r"^([A-Z]{2,6}(?:-[A-Z]{2})?)")
+
+
+def normalize_code(code: str) -> str:
+    """
+    "cs-gy 6003" / "CS-GY6003" / "CS GY 6003" -> "CSGY6003".
+    """
+    return re.sub(r"[^A-Z0-9]", "", (code or "").upper())
+
+
+def normalize_term(term: str) -> str:
+    return " ".join((term or "").lower().split())
+
+
+def department_prefixes(code: str) -> List[str]:
+    """
+    "CS-GY 6003" -> ["CS", "CS-GY"], so both the subject and the school-specific department can be looked up.
+    """
+    match = DEPARTMENT_RE.match((code or "").strip().upper())
+    if not match:
+        return []
+    department = match.group(1)
+    subject = department.split("-")[0]
+    return [subject] if subject == department else [subject, department]
+
+
+# Catalogs repeat the same instructors, codes and terms many times; normalize each string once
+_instructor_key = lru_cache(maxsize=65536)(normalize_name)
+_code_key = lru_cache(maxsize=65536)(normalize_code)
+_term_key = lru_cache(maxsize=1024)(normalize_term)
+_department_keys = lru_cache(maxsize=65536)(department_prefixes)
+
+
+class CourseRecord:
+    """
+    Lightweight, slots-based stand-in for Course (no validation, a fraction of the memory).
+    `position` is the index of the row in the source list.
+    """
+    __slots__ = COURSE_FIELDS + ("position",)
+
+    def __init__(self, position: int = 0, **fields):
+        self.position = position
+        for name in COURSE_FIELDS:
+            setattr(self, name, fields.get(name))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in COURSE_FIELDS}
+
+    def to_course(self) -> Course:
+        return Course(**self.to_dict())
+
+    @property
+    def is_tbd(self) -> bool:
+        return _instructor_key(self.instructor or "") in PLACEHOLDER_INSTRUCTORS
+
+
+class CourseCatalog:
+    """
+    In-memory course catalog with hash indexes on normalized course code, instructor and term,
+    and on department prefixes ("CS" and "CS-GY"). Every lookup is a dict access.
+    """
+    def __init__(self, records: Iterable[CourseRecord] = ()):
+        self.records: List[CourseRecord] = []
+        self._by_code: Dict[str, List[int]] = {}
+        self._by_instructor: Dict[str, List[int]] = {}
+        self._by_term: Dict[str, List[int]] = {}
+        self._by_department: Dict[str, List[int]] = {}
+        self._by_code_term: Dict[Tuple[str, str], List[int]] = {}
+        for record in records:
+            self.add(record)
+
+    @classmethod
+    def from_dicts(cls, rows: Iterable[Dict[str, Any]], field_map: Optional[Dict[str, str]] = None) -> "CourseCatalog":
+        """
+        Builds a catalog from plain dicts. field_map renames keys first (e.g. PARSED_FIELDS for parser output).
+        """
+        records = []
+        for position, row in enumerate(rows):
+            if field_map:
+                row = {field_map.get(k, k): v for k, v in row.items()}
+            records.append(CourseRecord(position, **row))
+        return cls(records)
+
+    @classmethod
+    def from_json(cls, path: str) -> "CourseCatalog":
+        # Raw dicts straight into records; no pydantic validation on the hot path
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dicts(json.load(f))
+
+    def add(self, record: CourseRecord):
+        i = len(self.records)
+        self.records.append(record)
+        code = _code_key(record.course_id or "")
+        term = _term_key(record.term or "")
+        self._by_code.setdefault(code, []).append(i)
+        self._by_instructor.setdefault(_instructor_key(record.instructor or ""), []).append(i)
+        self._by_term.setdefault(term, []).append(i)
+        self._by_code_term.setdefault((code, term), []).append(i)
+        for prefix in _department_keys(record.course_id or ""):
+            self._by_department.setdefault(prefix, []).append(i)
+
+    def _select(self, index: Dict[Any, List[int]], key: Any) -> List[CourseRecord]:
+        return [self.records[i] for i in index.get(key, ())]
+
+    def by_code(self, course_id: str, term: Optional[str] = None) -> List[CourseRecord]:
+        """
+        All sections of a course, optionally in one term.
+        """
+        if term is None:
+            return self._select(self._by_code, normalize_code(course_id))
+        return self._select(self._by_code_term, (normalize_code(course_id), normalize_term(term)))
+
+    def by_instructor(self, name: str) -> List[CourseRecord]:
+        return self._select(self._by_instructor, normalize_name(name))
+
+    def by_term(self, term: str) -> List[CourseRecord]:
+        return self._select(self._by_term, normalize_term(term))
+
+    def by_department(self, department: str) -> List[CourseRecord]:
+        """
+        "CS" matches every CS-* department; "CS-GY" only that one.
+        """
+        return self._select(self._by_department, (department or "").strip().upper())
+
+    def tbd(self) -> List[CourseRecord]:
+        """
+        Sections whose instructor is not announced yet.
+        """
+        return [self.records[i] for key in PLACEHOLDER_INSTRUCTORS for i in self._by_instructor.get(key, ())]
+
+    def instructors(self) -> Dict[str, str]:
+        """
+        {normalized name: name as first seen} for every real instructor.
+        """
+        return {key: self.records[ids[0]].instructor for key, ids in self._by_instructor.items() if key not in PLACEHOLDER_INSTRUCTORS}
+
+    def terms(self) -> List[str]:
+        return [self.records[ids[0]].term for ids in self._by_term.values()]
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[CourseRecord]:
+        return iter(self.records)
+
+
+_catalogs: Dict[str, Tuple[float, CourseCatalog]] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(path: str = DEFAULT_CATALOG_PATH) -> CourseCatalog:
+    """
+    Returns the process-wide catalog for a JSON file, loaded on first use
+    and reloaded when the file changes. Shared by every Streamlit session.
+    """
+    key = os.path.abspath(path)
+    mtime = os.path.getmtime(key)
+    with _catalogs_lock:
+        cached = _catalogs.get(key)
+        if cached is None or cached[0] != mtime:
+            _catalogs[key] = (mtime, CourseCatalog.from_json(key))
+        return _catalogs[key][1]
@@ -7,7 +7,7 @@ from .models import Course
 logger = logging.getLogger(__name__)
 
 import json
-from typing import List
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 from .models import Course
 import logging
 
@@ -20,21 +20,111 @@ class CourseFetcher(ABC):
 
 class JSONFileFetcher(CourseFetcher):
     """
-    Parses courses from a JSON file.
+    Parses courses from a JSON file (a JSON array or JSON Lines).
     """
     def __init__(self, file_path: str):
         self.file_path = file_path
 
     def fetch_courses(self) -> List[Course]:
         try:
-            with open(self.file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            return [Course(**item) for item in data]
+            return list(StreamingJSONFetcher(self.file_path, skip_invalid=False).iter_courses())
         except Exception as e:
             logger.error(f"Error reading file {self.file_path}: {e}")
             return []
 
 
+REQUIRED_FIELDS = ("course_id", "name", "instructor", "school", "term")
+
+
+def iter_json_records(file_path: str, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """
+    Yields the elements of a top-level JSON array, or the values of a JSON Lines /
+    concatenated-JSON file, reading chunk_size characters at a time.
+    Memory is bounded by the largest single record, not the file.
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        buffer = ""
+        pos = 0
+        is_array = None
+
+        while True:
+            # Skip whitespace (and array separators)
+            while pos < len(buffer) and (buffer[pos].isspace() or (is_array and buffer[pos] == ",")):
+                pos += 1
+
+            if pos >= len(buffer):
+                buffer, pos = f.read(chunk_size), 0
+                if not buffer:
+                    return
+                continue
+
+            if is_array is None:
+                is_array = buffer[pos] == "["
+                if is_array:
+                    pos += 1
+                continue
+            if is_array and buffer[pos] == "]":
+                return
+
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Record straddles the chunk boundary: read more and retry
+                more = f.read(chunk_size)
+                if not more:
+                    raise
+                buffer, pos = buffer[pos:] + more, 0
+                continue
+
+            yield value
+            pos = end
+            if pos > chunk_size:
+                buffer, pos = buffer[pos:], 0
+
+
+class StreamingJSONFetcher(CourseFetcher):
+    """
+    Yields validated Course objects one at a time from a JSON array or JSON Lines file.
+    `fields` projects each record onto a subset of Course fields before validation
+    (required fields are always kept), so large unused text never reaches pydantic.
+    """
+    def __init__(self, file_path: str, fields: Optional[Iterable[str]] = None, skip_invalid: bool = True, chunk_size: int = 1 << 16):
+        self.file_path = file_path
+        self.fields = set(fields) | set(REQUIRED_FIELDS) if fields else None
+        self.skip_invalid = skip_invalid
+        self.chunk_size = chunk_size
+        self.skipped = 0
+        # Records read from the file so far, counting skipped ones; a stable resume position
+        self.position = 0
+
+    def iter_records(self, start: int = 0) -> Iterator[Dict[str, Any]]:
+        """
+        start skips that many records without projecting or validating them (resuming a stream).
+        """
+        self.position = 0
+        for record in iter_json_records(self.file_path, self.chunk_size):
+            self.position += 1
+            if self.position <= start or not isinstance(record, dict):
+                continue
+            if self.fields is not None:
+                record = {k: v for k, v in record.items() if k in self.fields}
+            yield record
+
+    def iter_courses(self, start: int = 0) -> Iterator[Course]:
+        for record in self.iter_records(start):
+            try:
+                yield Course(**record)
+            except Exception as e:
+                if not self.skip_invalid:
+                    raise
+                self.skipped += 1
+                logger.warning(f"Skipping invalid course record in {self.file_path}: {e}")
+
+    def fetch_courses(self) -> List[Course]:
+        return list(self.iter_courses())
+
+
 class MockCourseFetcher(CourseFetcher):
     """
     Returns dummy data for testing.
@@ -1,5 +1,13 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
+
+
+def model_to_dict(model: BaseModel) -> Dict[str, Any]:
+    """
+    Works with both pydantic v1 and v2.
+    """
+    return model.model_dump() if hasattr(model, "model_dump") else model.dict()
+
 
 class Course(BaseModel):
     """
@@ -20,6 +28,8 @@ class Course(BaseModel):
     rmp_rating: Optional[float] = Field(None, description="Average rating from RMP (0-5)")
     rmp_num_ratings: Optional[int] = Field(None, description="Number of ratings on RMP")
     rmp_summary: Optional[str] = Field(None, description="AI-generated summary of student reviews")
+    review_rating: Optional[float] = Field(None, description="Rating (0-5) estimated from review text when no RMP rating was found; not an RMP number")
+    rating_source: Optional[str] = Field(None, description="Where the rating came from: 'rmp' (rmp_rating) or 'reddit' / 'reviews' (review_rating)")
     
     def to_document_text(self) -> str:
         """
@@ -33,3 +43,21 @@ class Course(BaseModel):
         if self.rmp_summary:
             text += f"Professor Reviews: {self.rmp_summary}\n"
         return text
+
+
+class ProfessorProfile(BaseModel):
+    """
+    Precomputed RMP profile for one instructor (see src/data/professor_index.py).
+    """
+    name: str = Field(..., description="Normalized name, e.g. 'ying lu'")
+    display_name: str = Field(..., description="Name as shown to users, e.g. 'Ying Lu'")
+    aliases: List[str] = Field(default_factory=list, description="Other normalized spellings, e.g. 'lu ying'")
+    school: Optional[str] = Field(None, description="School used for the lookup")
+
+    rating: Optional[float] = Field(None, description="Overall quality (0-5)")
+    difficulty: Optional[float] = Field(None, description="Level of difficulty (0-5)")
+    would_take_again: Optional[float] = Field(None, description="Would take again (0-100)")
+    num_ratings: Optional[int] = Field(None, description="Number of ratings on RMP")
+    summary: Optional[str] = Field(None, description="Short summary of student reviews")
+    has_data: bool = Field(False, description="Whether any RMP data was found")
+    fetched_at: float = Field(..., description="Unix timestamp of the lookup")
@@ -0,0 +1,233 @@
+import os
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from src.data.catalog import DEFAULT_CATALOG_PATH, get_catalog
+from src.data.professor_index import ProfessorIndex, get_professor_index, normalize_name
+
+# Minimum first-name similarity (0-1) for a fuzzy match, unless one side is just an initial
+NAME_MATCH_THRESHOLD = float(os.getenv("NAME_MATCH_THRESHOLD", "0.88"))
+# Minimum surname similarity; high, so one typo passes but two people sharing a first name do not
+SURNAME_MATCH_THRESHOLD = float(os.getenv("SURNAME_MATCH_THRESHOLD", "0.85"))
+# Candidates from the trigram index that get full scoring
+MAX_CANDIDATES = 20
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def split_name(key: str) -> Tuple[str, str]:
+    """
+    Normalized "linda m sellie" -> ("linda m", "sellie").
+    """
+    first, _, surname = key.rpartition(" ")
+    return first, surname
+
+
+def jaro_winkler(a: str, b: str, prefix_scale: float = 0.1) -> float:
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    window = max(0, max(len(a), len(b)) // 2 - 1)
+    a_flags = [False] * len(a)
+    b_flags = [False] * len(b)
+    matches = 0
+    for i, ch in enumerate(a):
+        for j in range(max(0, i - window), min(len(b), i + window + 1)):
+            if not b_flags[j] and b[j] == ch:
+                a_flags[i] = b_flags[j] = True
+                matches += 1
+                break
+    if not matches:
+        return 0.0
+
+    transpositions = 0
+    j = 0
+    for i, ch in enumerate(a):
+        if a_flags[i]:
+            while not b_flags[j]:
+                j += 1
+            if ch != b[j]:
+                transpositions += 1
+            j += 1
+    jaro = (matches / len(a) + matches / len(b) + (matches - transpositions / 2) / matches) / 3
+
+    prefix = 0
+    for x, y in zip(a[:4], b[:4]):
+        if x != y:
+            break
+        prefix += 1
+    return jaro + prefix * prefix_scale * (1 - jaro)
+
+
+def levenshtein_ratio(a: str, b: str) -> float:
+    if a == b:
+        return 1.0
+    previous = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        current = [i]
+        for j, y in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (x != y)))
+        previous = current
+    return 1 - previous[-1] / max(len(a), len(b))
+
+
+def similarity(a: str, b: str) -> float:
+    """
+    Blend of Jaro-Winkler (forgiving of typos near the end) and Levenshtein (penalizes every edit).
+    """
+    return 0.5 * jaro_winkler(a, b) + 0.5 * levenshtein_ratio(a, b)
+
+
+def initial_match(a: str, b: str) -> bool:
+    """
+    "l" vs "linda": one first name is only an initial, and it agrees with the other.
+    """
+    a, b = a.split()[0], b.split()[0]
+    return (len(a) == 1 or len(b) == 1) and a[0] == b[0]
+
+
+class NameMatch:
+    __slots__ = ("name", "key", "score", "method")
+
+    def __init__(self, name: str, key: str, score: float, method: str):
+        self.name = name        # Canonical display name, e.g. "Linda Sellie"
+        self.key = key          # Normalized canonical name, e.g. "linda sellie"
+        self.score = score
+        self.method = method    # "exact" | "alias" | "fuzzy"
+
+    def __repr__(self) -> str:
+        return f"NameMatch({self.name!r}, score={self.score:.2f}, method={self.method!r})"
+
+
+class NameResolver:
+    """
+    Maps misspelled / reordered professor names onto known instructors without any network call.
+    Exact and alias hits are dict lookups; otherwise a trigram inverted index picks a few
+    candidates that are scored with Jaro-Winkler + Levenshtein. A candidate needs a near-identical
+    surname and a similar first name (or a matching initial), so two people who only share a
+    surname ("yu chen" / "yi chen") stay apart while "linda selie" still finds "linda sellie".
+
+    Fuzzy matches are suggestions: they are written to the ProfessorIndex alias table only through
+    learn(), once a user has accepted the correction.
+    """
+    def __init__(self, names: Iterable[str] = (), index: Optional[ProfessorIndex] = None, threshold: float = NAME_MATCH_THRESHOLD):
+        self.index = index
+        self.threshold = threshold
+        self._display: Dict[str, str] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        for name in names:
+            self.add(name)
+
+    def add(self, name: str, key: Optional[str] = None):
+        key = key or normalize_name(name)
+        if not key:
+            return
+        with self._lock:
+            if key in self._display:
+                return
+            self._display[key] = name
+            for gram in trigrams(key):
+                self._postings.setdefault(gram, set()).add(key)
+
+    def __len__(self) -> int:
+        return len(self._display)
+
+    def candidates(self, key: str, limit: int = MAX_CANDIDATES) -> List[str]:
+        """
+        Known names sharing the most trigrams with key.
+        """
+        grams = trigrams(key)
+        counts: Counter = Counter()
+        with self._lock:
+            for gram in grams:
+                counts.update(self._postings.get(gram, ()))
+        minimum = max(1, len(grams) // 3)
+        return [name for name, shared in counts.most_common(limit) if shared >= minimum]
+
+    def score(self, key: str, candidate: str) -> float:
+        """
+        Full-name similarity of two normalized names, or 0 if surnames or first names disagree.
+        """
+        first, surname = split_name(key)
+        candidate_first, candidate_surname = split_name(candidate)
+        if not first or not candidate_first:
+            return 0.0
+        if similarity(surname, candidate_surname) < SURNAME_MATCH_THRESHOLD:
+            return 0.0
+        if similarity(first, candidate_first) < self.threshold and not initial_match(first, candidate_first):
+            return 0.0
+        return similarity(key, candidate)
+
+    def resolve(self, name: str, learn: bool = False) -> Optional[NameMatch]:
+        """
+        Returns the best known instructor for name, or None if nothing is close enough.
+        learn=True records a fuzzy match as an alias right away; only pass it for a confirmed correction.
+        """
+        key = normalize_name(name)
+        if not key:
+            return None
+        if key in self._display:
+            return NameMatch(self._display[key], key, 1.0, "exact")
+
+        if self.index is not None:
+            aliased = self.index.resolve(key)
+            if aliased != key and aliased in self._display:
+                return NameMatch(self._display[aliased], aliased, 1.0, "alias")
+
+        # "Sellie Linda" style input without a comma is a reordering, not a typo
+        reordered = " ".join(reversed(key.split()))
+        if reordered in self._display:
+            return NameMatch(self._display[reordered], reordered, 1.0, "exact")
+
+        variants = {key, reordered}
+        best_key, best_score = None, 0.0
+        for variant in variants:
+            for candidate in self.candidates(variant):
+                score = self.score(variant, candidate)
+                if score > best_score:
+                    best_key, best_score = candidate, score
+
+        if best_key is None:
+            return None
+        if learn:
+            self.learn(key, best_key)
+        return NameMatch(self._display[best_key], best_key, best_score, "fuzzy")
+
+    def learn(self, alias: str, canonical: str):
+        """
+        Records an accepted correction (alias -> canonical) in the persisted alias table.
+        """
+        if self.index is not None:
+            self.index.add_alias(alias, canonical)
+
+
+_resolver: Optional[NameResolver] = None
+_resolver_version = None
+_resolver_lock = threading.Lock()
+
+
+def get_name_resolver() -> NameResolver:
+    """
+    Returns the process-wide resolver over every known instructor: the course catalog
+    plus the professor index. Rebuilt when either of them changes.
+    """
+    global _resolver, _resolver_version
+    index = get_professor_index()
+    catalog_mtime = os.path.getmtime(DEFAULT_CATALOG_PATH) if os.path.exists(DEFAULT_CATALOG_PATH) else None
+    version = (catalog_mtime, index.version())
+    with _resolver_lock:
+        if _resolver is None or _resolver_version != version:
+            resolver = NameResolver(index=index)
+            for key, display_name in index.display_names().items():
+                resolver.add(display_name, key)
+            if catalog_mtime is not None:
+                for key, display_name in get_catalog().instructors().items():
+                    resolver.add(display_name, key)
+            _resolver, _resolver_version = resolver, version
+        return _resolver
@@ -1,49 +1,129 @@
-from typing import List, Tuple, Dict, Any
+from operator import attrgetter
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+from src.data.cache import make_key
 from src.data.models import Course
 
+PROCESS_BATCH_SIZE = 100
+
+# (label, Course attribute) in document order. Empty fields are left out of the text.
+DOCUMENT_TEMPLATE = (
+    ("Course Code", "course_id"),
+    ("Course Name", "name"),
+    ("Instructor", "instructor"),
+    ("School", "school"),
+    ("Term", "term"),
+    ("Description", "description"),
+    ("Schedule", "schedule"),
+    ("Instruction Mode", "instruction_mode"),
+    ("Professor Rating", "rmp_rating"),
+    ("Professor Summary", "rmp_summary"),
+)
+_DOCUMENT_LINES = tuple(f"{label}: {{}}".format for label, _ in DOCUMENT_TEMPLATE)
+_DOCUMENT_FIELDS = attrgetter(*(attr for _, attr in DOCUMENT_TEMPLATE))
+
+# Every row carries every key with the same type, so where-filters behave the same for all courses
+METADATA_SCHEMA = {
+    "course_id": "",
+    "name": "",
+    "instructor": "",
+    "school": "",
+    "term": "",
+    "instruction_mode": "",
+    "units": 0.0,
+    "rating": 0.0,
+    "num_ratings": 0,
+    "rmp_summary": "",
+}
+_METADATA_FIELDS = attrgetter("course_id", "name", "instructor", "school", "term", "instruction_mode", "units", "rmp_rating", "rmp_num_ratings", "rmp_summary")
+
+
+def content_hash(document: str, metadata: Dict[str, Any]) -> str:
+    """
+    Hash of everything we store for a row (excluding the hash itself).
+    """
+    return make_key(document, {k: v for k, v in metadata.items() if k != "content_hash"})
+
+
 class DocumentProcessor:
     @staticmethod
-    def process_courses(courses: List[Course]) -> Tuple[List[str], List[Dict[str, Any]], List[str]]:
+    def parse_units(units) -> float:
+        # Stored as a number so it can be filtered on; 0.0 when unknown
+        try:
+            return float(units)
+        except (TypeError, ValueError):
+            return 0.0
+
+    @staticmethod
+    def document_id(course: Course) -> str:
+        return f"{course.course_id}|{course.term}"
+
+    @staticmethod
+    def build_document(course: Course) -> str:
+        """
+        Rich text representation for embedding; includes every non-empty key field so
+        semantic search can match on any aspect.
+        """
+        return "\n".join(
+            line(value) for line, value in zip(_DOCUMENT_LINES, _DOCUMENT_FIELDS(course))
+            if value is not None and value != ""
+        )
+
+    @staticmethod
+    def build_metadata(course: Course) -> Dict[str, Any]:
         """
-        Converts a list of Course objects into lists of documents, metadatas, and ids suitable for ChromaDB.
+        Metadata for filtering and retrieval, following METADATA_SCHEMA.
         """
-        documents = []
-        metadatas = []
-        ids = []
+        course_id, name, instructor, school, term, mode, units, rating, num_ratings, summary = _METADATA_FIELDS(course)
+        return {
+            "course_id": course_id or "",
+            "name": name or "",
+            "instructor": instructor or "",
+            "school": school or "",
+            "term": term or "",
+            "instruction_mode": mode or "",
+            "units": DocumentProcessor.parse_units(units),
+            "rating": float(rating or 0.0),
+            "num_ratings": int(num_ratings or 0),
+            "rmp_summary": summary or "",
+        }
 
+    @staticmethod
+    def iter_documents(courses: Iterable[Course]) -> Iterator[Tuple[str, Dict[str, Any], str]]:
+        """
+        Streams (document, metadata, id) for each course. Works on Course objects and
+        CourseRecords alike. The metadata includes a content_hash for change detection.
+        """
         for course in courses:
-            # Construct a rich text representation for embedding
-            # We include all key fields so the semantic search can match on any aspect.
-            doc_text = f"""
-            Course Code: {course.course_id}
-            Course Name: {course.name}
-            Instructor: {course.instructor}
-            School: {course.school}
-            Term: {course.term}
-            Description: {course.description}
-            Schedule: {course.schedule}
-            Instruction Mode: {course.instruction_mode}
-            
-            Professor Rating: {course.rmp_rating if course.rmp_rating else 'N/A'}
-            Professor Summary: {course.rmp_summary if course.rmp_summary else 'N/A'}
-            """
-            
-            # Clean up whitespace
-            doc_text = "\n".join([line.strip() for line in doc_text.split('\n') if line.strip()])
-            
-            documents.append(doc_text)
-            
-            # Metadata for filtering and retrieval
-            metadatas.append({
-                "course_id": course.course_id,
-                "name": course.name,
-                "instructor": course.instructor,
-                "school": course.school,
-                "units": course.units,
-                "rating": course.rmp_rating if course.rmp_rating else 0.0,
-                "rmp_summary": course.rmp_summary if course.rmp_summary else "N/A"
-            })
-            
-            ids.append(course.course_id)
+            document = DocumentProcessor.build_document(course)
+            metadata = DocumentProcessor.build_metadata(course)
+            metadata["content_hash"] = content_hash(document, metadata)
+            # One row per course per term, so re-ingesting a term upserts in place
+            yield document, metadata, DocumentProcessor.document_id(course)
+
+    @staticmethod
+    def iter_batches(courses: Iterable[Course], batch_size: int = PROCESS_BATCH_SIZE) -> Iterator[Tuple[List[str], List[Dict[str, Any]], List[str]]]:
+        """
+        Streams (documents, metadatas, ids) batches of at most batch_size, ready for CourseVectorStore.add_courses().
+        """
+        documents, metadatas, ids = [], [], []
+        for document, metadata, doc_id in DocumentProcessor.iter_documents(courses):
+            documents.append(document)
+            metadatas.append(metadata)
+            ids.append(doc_id)
+            if len(ids) >= batch_size:
+                yield documents, metadatas, ids
+                documents, metadatas, ids = [], [], []
+        if ids:
+            yield documents, metadatas, ids
 
+    @staticmethod
+    def process_courses(courses: Iterable[Course]) -> Tuple[List[str], List[Dict[str, Any]], List[str]]:
+        """
+        Converts Course objects (any iterable, e.g. a StreamingJSONFetcher batch) into lists of
+        documents, metadatas, and ids suitable for ChromaDB.
+        """
+        rows = list(DocumentProcessor.iter_documents(courses))
+        if not rows:
+            return [], [], []
+        documents, metadatas, ids = (list(column) for column in zip(*rows))
         return documents, metadatas, ids
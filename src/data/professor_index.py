@@ -0,0 +1,159 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.data.cache import CACHE_DIR
+from src.data.models import ProfessorProfile, model_to_dict
+
+# Profiles older than this are treated as a miss and refreshed from the network.
+PROFESSOR_INDEX_TTL = int(os.getenv("PROFESSOR_INDEX_TTL", str(30 * 24 * 3600)))
+
+
+def normalize_name(name: str) -> str:
+    """
+    "Lu, Ying" / "Prof. Ying Lu" / "ying  lu" -> "ying lu".
+    """
+    name = (name or "").strip()
+    if name.count(",") == 1:
+        last, first = name.split(",")
+        name = f"{first} {last}"
+    name = re.sub(r"^(prof\.?|professor|dr\.?)\s+", "", name.strip(), flags=re.IGNORECASE)
+    name = re.sub(r"[^\w\s'-]", " ", name.lower())
+    return " ".join(name.split())
+
+
+def profile_to_rmp_data(profile: ProfessorProfile) -> Dict[str, Any]:
+    """
+    Same shape as JudgeAgent.extract_rmp_data() output.
+    """
+    return {
+        "rmp_rating": profile.rating,
+        "difficulty": profile.difficulty,
+        "would_take_again_percent": profile.would_take_again,
+        "summary": profile.summary or "No data found.",
+        "has_data": profile.has_data,
+        "review_count": profile.num_ratings or 0,
+    }
+
+
+def profile_from_rmp_data(display_name: str, school: Optional[str], data: Dict[str, Any]) -> ProfessorProfile:
+    """
+    Builds a profile from JudgeAgent.extract_rmp_data() output.
+    """
+    name = normalize_name(display_name)
+    parts = name.split()
+    aliases = [" ".join(reversed(parts))] if len(parts) == 2 else []
+    return ProfessorProfile(
+        name=name,
+        display_name=display_name,
+        aliases=aliases,
+        school=school,
+        rating=data.get("rmp_rating"),
+        difficulty=data.get("difficulty"),
+        would_take_again=data.get("would_take_again_percent"),
+        num_ratings=data.get("review_count"),
+        summary=data.get("summary"),
+        has_data=bool(data.get("has_data")),
+        fetched_at=time.time(),
+    )
+
+
+class ProfessorIndex:
+    """
+    Local SQLite store of ProfessorProfile records with an alias table.
+    Filled offline by build_professor_index.py; read by the UI and CourseAdvisor before any network call.
+    """
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(CACHE_DIR, "professors.sqlite3")
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS professors (name TEXT PRIMARY KEY, data TEXT NOT NULL, fetched_at REAL NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS aliases (alias TEXT PRIMARY KEY, name TEXT NOT NULL)")
+        self._conn.commit()
+
+    def resolve(self, name: str) -> str:
+        """
+        Maps any known spelling to the canonical normalized name.
+        """
+        key = normalize_name(name)
+        with self._lock:
+            row = self._conn.execute("SELECT name FROM aliases WHERE alias = ?", (key,)).fetchone()
+        return row[0] if row else key
+
+    def get(self, name: str, max_age: Optional[float] = PROFESSOR_INDEX_TTL) -> Optional[ProfessorProfile]:
+        """
+        Returns the profile, or None if unknown or older than max_age seconds.
+        """
+        key = self.resolve(name)
+        with self._lock:
+            row = self._conn.execute("SELECT data, fetched_at FROM professors WHERE name = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if max_age is not None and time.time() - row[1] > max_age:
+            return None
+        return ProfessorProfile(**json.loads(row[0]))
+
+    def upsert(self, profile: ProfessorProfile):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO professors (name, data, fetched_at) VALUES (?, ?, ?)",
+                (profile.name, json.dumps(model_to_dict(profile), ensure_ascii=False), profile.fetched_at)
+            )
+            for alias in [profile.name] + profile.aliases:
+                self._conn.execute("INSERT OR REPLACE INTO aliases (alias, name) VALUES (?, ?)", (normalize_name(alias), profile.name))
+            self._conn.commit()
+            self._writes += 1
+
+    def add_alias(self, alias: str, name: str):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO aliases (alias, name) VALUES (?, ?)", (normalize_name(alias), normalize_name(name)))
+            self._conn.commit()
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT name FROM professors")]
+
+    def display_names(self) -> Dict[str, str]:
+        """
+        {normalized name: display name} for every profile.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT name, data FROM professors").fetchall()
+        return {name: json.loads(data).get("display_name") or name for name, data in rows}
+
+    def version(self) -> Tuple[int, int]:
+        """
+        Changes whenever profiles are written, by this process (write counter) or another one (SQLite data_version).
+        """
+        with self._lock:
+            (data_version,) = self._conn.execute("PRAGMA data_version").fetchone()
+        return self._writes, data_version
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM professors").fetchone()
+        return count
+
+
+_index: Optional[ProfessorIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_professor_index() -> ProfessorIndex:
+    """
+    Returns the process-wide ProfessorIndex.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ProfessorIndex()
+        return _index
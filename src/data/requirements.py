@@ -0,0 +1,257 @@
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.data.cache import SQLiteCache, get_cache, make_key
+from src.data.search import get_search_client
+from src.engine.concurrency import SingleFlight
+from src.engine.context import CONTEXT_BUDGETS, pack_text
+from src.engine.llm import get_llm
+from src.engine.model_pool import resolve_model
+
+# Summaries older than this are still served, but refreshed in the background.
+REQUIREMENTS_REFRESH_AGE = int(os.getenv("REQUIREMENTS_REFRESH_AGE", str(30 * 24 * 3600)))
+# Hard expiry; past this an entry is gone and the next request fetches inline.
+REQUIREMENTS_TTL = int(os.getenv("REQUIREMENTS_TTL", str(180 * 24 * 3600)))
+# Bump when the summary prompt or schema changes.
+REQUIREMENTS_VERSION = 2
+
+# Programs most users pick; warmed in the background so their onboarding never waits on a search.
+POPULAR_PROGRAMS = [
+    ("NYU Tandon", "Computer Science"),
+    ("NYU Tandon", "Computer Engineering"),
+    ("NYU Tandon", "Electrical Engineering"),
+    ("NYU Tandon", "Financial Engineering"),
+    ("NYU Tandon", "Cybersecurity"),
+    ("NYU Courant", "Computer Science"),
+    ("NYU Courant", "Mathematics"),
+    ("NYU CDS", "Data Science"),
+]
+
+# Spellings users type at onboarding -> canonical (normalized) name. Entries are shared per program,
+# so only unambiguous spellings belong here ("CE" is Computer or Civil Engineering, "EE" / "FE" / "DS" vary too).
+SCHOOL_ALIASES = {
+    "tandon": "nyu tandon",
+    "nyu tandon school of engineering": "nyu tandon",
+    "new york university tandon": "nyu tandon",
+    "new york university tandon school of engineering": "nyu tandon",
+    "nyu poly": "nyu tandon",
+    "courant": "nyu courant",
+    "nyu courant institute": "nyu courant",
+    "courant institute of mathematical sciences": "nyu courant",
+    "nyu center for data science": "nyu cds",
+    "center for data science": "nyu cds",
+}
+MAJOR_ALIASES = {
+    "cs": "computer science",
+    "comp sci": "computer science",
+    "ms cs": "computer science",
+    "mscs": "computer science",
+    "ms in computer science": "computer science",
+    "ms in data science": "data science",
+    "cyber security": "cybersecurity",
+    "math": "mathematics",
+}
+
+UNKNOWN_PROGRAM = "No requirements fetched (School Unknown)."
+FETCH_FAILED = "Could not fetch requirements."
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", (text or "").lower()).split())
+
+
+def normalize_program(school: str, major: str) -> Tuple[str, str]:
+    """
+    ("New York University Tandon", "CS") -> ("nyu tandon", "computer science").
+    """
+    school_key = _normalize(school)
+    major_key = _normalize(major)
+    return SCHOOL_ALIASES.get(school_key, school_key), MAJOR_ALIASES.get(major_key, major_key)
+
+
+def is_known_program(school: str, major: str) -> bool:
+    return all(part and part != "unknown" for part in normalize_program(school, major))
+
+
+def format_requirements(summary: Dict[str, Any]) -> str:
+    """
+    Compact text rendering of a requirements summary, used verbatim in every prompt.
+    """
+    lines = [f"Program: {summary.get('program')}"]
+    if summary.get("total_credits"):
+        lines.append(f"Total credits: {summary['total_credits']}")
+    if summary.get("core_courses"):
+        lines.append("Core: " + "; ".join(summary["core_courses"]))
+    if summary.get("electives"):
+        lines.append("Electives: " + "; ".join(summary["electives"]))
+    if summary.get("rules"):
+        lines.append("Rules: " + "; ".join(summary["rules"]))
+    if summary.get("sources"):
+        lines.append("Sources: " + ", ".join(summary["sources"]))
+    return "\n".join(lines)
+
+
+class RequirementsStore:
+    """
+    Degree requirements per (school, major), shared by every session and persisted across restarts.
+    The search results are compacted once into a structured summary (core courses, electives,
+    credit rules), and prompts only ever see format_requirements() of that summary.
+
+    Entries older than REQUIREMENTS_REFRESH_AGE are served as-is and refreshed in the background;
+    concurrent fetches of the same program (sessions, pre-warm) share one search.
+    """
+    def __init__(self, cache: Optional[SQLiteCache] = None, refresh_age: int = REQUIREMENTS_REFRESH_AGE, ttl: int = REQUIREMENTS_TTL):
+        self.cache = cache or get_cache("requirements")
+        self.refresh_age = refresh_age
+        self.ttl = ttl
+        self._in_flight = SingleFlight()
+
+    @staticmethod
+    def key(school: str, major: str) -> str:
+        return make_key("requirements", REQUIREMENTS_VERSION, *normalize_program(school, major))
+
+    def get(self, school: str, major: str) -> Optional[Dict[str, Any]]:
+        """
+        The stored entry ({"summary", "text", "fetched_at"}), or None. Never touches the network.
+        """
+        return self.cache.get(self.key(school, major))
+
+    def is_stale(self, entry: Optional[Dict[str, Any]]) -> bool:
+        return entry is None or time.time() - entry.get("fetched_at", 0) > self.refresh_age
+
+    def requirements_text(self, school: str, major: str, tavily_api_key: Optional[str] = None, google_api_key: Optional[str] = None) -> str:
+        """
+        Prompt-ready requirements for a program. Blocks only when nothing is stored yet.
+        """
+        if not is_known_program(school, major):
+            return UNKNOWN_PROGRAM
+        entry = self.get(school, major)
+        if entry is None:
+            try:
+                entry = self.fetch(school, major, tavily_api_key, google_api_key)
+            except Exception as e:
+                print(f"Requirements fetch failed for {school} / {major}: {e}")
+                return FETCH_FAILED
+        elif self.is_stale(entry):
+            self.refresh_in_background([(school, major)], tavily_api_key, google_api_key)
+        return entry["text"]
+
+    def fetch(self, school: str, major: str, tavily_api_key: Optional[str] = None, google_api_key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Searches, summarizes and stores one program. Raises on failure, nothing is stored then.
+        """
+        key = self.key(school, major)
+        return self._in_flight.do(key, lambda: self._fetch(key, school, major, tavily_api_key, google_api_key))
+
+    def _fetch(self, key: str, school: str, major: str, tavily_api_key: Optional[str], google_api_key: Optional[str]) -> Dict[str, Any]:
+        # The entry is shared by every spelling of the program, so search with the canonical names
+        school, major = normalize_program(school, major)
+        query = f"{school} {major} degree requirements core courses electives pdf"
+        result = get_search_client(tavily_api_key).search(query=query, search_depth="advanced", max_results=3, source="requirements")
+        results = result.get("results") or []
+        if not results:
+            raise ValueError("no search results")
+
+        raw_text = "\n".join(f"- {r['content']} (Source: {r['url']})" for r in results)
+        summary = summarize_requirements(f"{school} {major}", raw_text, google_api_key)
+        if summary:
+            summary["sources"] = [r["url"] for r in results]
+            text = format_requirements(summary)
+        else:
+            # No usable summary; fall back to the most relevant passages of the raw results
+            text = pack_text(raw_text, budget_tokens=CONTEXT_BUDGETS["requirements"])
+
+        entry = {"school": school, "major": major, "summary": summary, "text": text, "fetched_at": time.time()}
+        self.cache.set(key, entry, self.ttl)
+        return entry
+
+    def refresh_in_background(self, programs: Iterable[Tuple[str, str]], tavily_api_key: Optional[str] = None,
+                              google_api_key: Optional[str] = None, force: bool = False) -> Optional[threading.Thread]:
+        """
+        Fetches every missing or stale program on a daemon thread. Returns the thread, or None if all are fresh.
+        """
+        todo = [(s, m) for s, m in programs if is_known_program(s, m) and (force or self.is_stale(self.get(s, m)))]
+        if not todo:
+            return None
+
+        def _run():
+            for school, major in todo:
+                try:
+                    self.fetch(school, major, tavily_api_key, google_api_key)
+                except Exception as e:
+                    print(f"Requirements pre-warm failed for {school} / {major}: {e}")
+
+        thread = threading.Thread(target=_run, name="requirements-prewarm", daemon=True)
+        thread.start()
+        return thread
+
+
+def summarize_requirements(program: str, raw_text: str, google_api_key: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    One LLM call turning search results into {"program", "total_credits", "core_courses", "electives", "rules"}.
+    Returns None when the model gives nothing usable.
+    """
+    model_name = resolve_model(['gemini-2.0-flash-lite', 'gemini-flash-latest'], google_api_key or os.getenv("GOOGLE_API_KEY"))
+    prompt = f"""
+    Summarize the degree requirements of {program} from these search results.
+    Keep course codes exactly as written. Be terse: one short phrase per list item.
+
+    Search Results:
+    {pack_text(raw_text, budget_tokens=CONTEXT_BUDGETS["judge"])}
+
+    Output JSON Schema:
+    {{
+        "program": string,
+        "total_credits": string | null,
+        "core_courses": [string],
+        "electives": [string],
+        "rules": [string]
+    }}
+    """
+    try:
+        text = get_llm(google_api_key).generate(model_name, prompt, generation_config={"response_mime_type": "application/json"})
+        data = json.loads(text)
+    except Exception as e:
+        print(f"Requirements summary failed for {program}: {e}")
+        return None
+    if isinstance(data, list) and data:
+        data = data[0]
+    if not isinstance(data, dict) or not (data.get("core_courses") or data.get("electives") or data.get("rules")):
+        return None
+    summary: Dict[str, Any] = {"program": data.get("program") or program, "total_credits": data.get("total_credits")}
+    for field in ("core_courses", "electives", "rules"):
+        items: List[Any] = data.get(field) or []
+        summary[field] = [str(item).strip() for item in items if str(item).strip()]
+    return summary
+
+
+_store: Optional[RequirementsStore] = None
+_store_lock = threading.Lock()
+_prewarmed = False
+
+
+def get_requirements_store() -> RequirementsStore:
+    """
+    Returns the process-wide RequirementsStore.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = RequirementsStore()
+        return _store
+
+
+def prewarm_popular_programs(tavily_api_key: Optional[str] = None, google_api_key: Optional[str] = None) -> Optional[threading.Thread]:
+    """
+    Starts the background pre-warm of POPULAR_PROGRAMS, once per process.
+    """
+    global _prewarmed
+    with _store_lock:
+        if _prewarmed:
+            return None
+        _prewarmed = True
+    return get_requirements_store().refresh_in_background(POPULAR_PROGRAMS, tavily_api_key, google_api_key)
@@ -1,18 +1,22 @@
+import asyncio
 import os
-import time
 import traceback
-from typing import Optional
-from tavily import TavilyClient
+from typing import Optional, Tuple
 from dotenv import load_dotenv
-import google.generativeai as genai
-from google.api_core import exceptions
+from src.data.cache import make_key
+from src.data.search import get_search_client, normalize_query
+from src.engine.concurrency import SingleFlight
+from src.engine.llm import get_llm
+from src.engine.model_pool import resolve_model
 
 load_dotenv()
 
 class RMPSearcher:
-    def __init__(self):
+    def __init__(self, strict: bool = False):
         # 确保这里 api_key 读取正确
-        self.tavily = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
+        self.tavily = get_search_client(os.getenv("TAVILY_API_KEY"))
+        # strict=True re-raises search errors (e.g. quota exhausted) instead of returning ""
+        self.strict = strict
 
     def search_professor(self, professor_name: str, school: str) -> str:
         """
@@ -20,11 +24,13 @@ class RMPSearcher:
         """
         query = f"{professor_name} {school} Rate My Professors"
         try:
-            response = self.tavily.search(query=query, search_depth="advanced", max_results=1)
+            response = self.tavily.search(query=query, search_depth="advanced", max_results=1, source="rmp")
             if not response.get('results'):
                 return ""
             return response['results'][0]['content']
         except Exception as e:
+            if self.strict:
+                raise
             print(f"Error searching RMP for {professor_name}: {e}")
             return ""
 
@@ -34,50 +40,66 @@ class RMPSearcher:
         """
         query = f"{course_code} NYU Tandon reddit workload review"
         try:
-            response = self.tavily.search(query=query, search_depth="advanced", max_results=2)
+            response = self.tavily.search(query=query, search_depth="advanced", max_results=2, source="reddit")
             if not response.get('results'):
                 return ""
             
             combined_content = "\n\n".join([res['content'] for res in response['results']])
             return combined_content
         except Exception as e:
+            if self.strict:
+                raise
             print(f"Error searching Reddit for {course_code}: {e}")
             return ""
 
+_lookups = SingleFlight()
+
+
+class AsyncRMPSearcher:
+    """
+    asyncio front-end for RMPSearcher. The Tavily client is blocking, so each lookup runs in the
+    default executor (going through the shared cache and rate limiter) while the caller awaits it.
+    Identical lookups already in flight (from any session or thread) are coalesced into one
+    request, and the professor / Reddit lookups for a course run at the same time.
+    Never starts an event loop itself; call it from the caller's loop.
+    """
+    def __init__(self, searcher: Optional[RMPSearcher] = None):
+        self.searcher = searcher or RMPSearcher()
+
+    async def search_professor(self, professor_name: str, school: str) -> str:
+        key = make_key("rmp", normalize_query(professor_name), normalize_query(school))
+        return await _lookups.do_async(key, lambda: self.searcher.search_professor(professor_name, school))
+
+    async def search_reddit(self, course_code: str) -> str:
+        key = make_key("reddit", normalize_query(course_code))
+        return await _lookups.do_async(key, lambda: self.searcher.search_reddit(course_code))
+
+    async def search_course(self, professor_name: Optional[str], course_code: str, school: str) -> Tuple[str, str]:
+        """
+        Returns (rmp_content, reddit_content). Pass professor_name=None to skip the RMP lookup.
+        """
+        async def _no_professor() -> str:
+            return ""
+
+        professor = self.search_professor(professor_name, school) if professor_name else _no_professor()
+        rmp_content, reddit_content = await asyncio.gather(professor, self.search_reddit(course_code))
+        return rmp_content, reddit_content
+
+
 class RMPAggregator:
     def __init__(self):
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-        
         # 不要用 gemini-2.0-flash-lite，它对免费用户限制极严
-        # 推荐使用 gemini-1.5-flash 或者 gemini-2.0-flash
-        self.model_name = 'gemini-2.0-flash-lite' 
-        self.model = genai.GenerativeModel(self.model_name)
-        print(f"✅ 使用全新 Key 启动，模型锁定为: {self.model_name}")
-        
-        self.model = None
-        self.model_name = ""
-
-        print("🔄 初始化 AI 模型...")
-        for name in candidates:
-            try:
-                # print(f"   尝试连接: {name} ...", end="") 
-                # 这里不带 models/ 前缀尝试，如果失败 SDK 通常会自动处理
-                test_model = genai.GenerativeModel(name)
-                test_model.generate_content("Hi") 
-                self.model = test_model
-                self.model_name = name
-                print(f"✅ 成功连接到主力模型: {name}")
-                break
-            except Exception:
-                # 静默失败，尝试下一个
-                continue
-        
-        if not self.model:
-            print("⚠️ 警告：主力模型均连接失败。尝试使用 Lite 版本（可能受限）...")
-            self.model_name = 'gemini-2.0-flash-lite'
-            self.model = genai.GenerativeModel(self.model_name)
+        # 推荐使用 gemini-1.5-flash 或者 gemini-2.0-flash (可用模型列表每个进程只查询一次)
+        candidates = ['gemini-1.5-flash', 'gemini-2.0-flash', 'gemini-2.0-flash-lite']
+        self.model_name = resolve_model(candidates, os.getenv("GOOGLE_API_KEY"))
+        print(f"✅ RMPAggregator 使用模型: {self.model_name}")
 
-    def summarize_reviews(self, professor_name: str, search_content: str) -> dict:
+    def summarize_reviews(self, professor_name: str, search_content: str, strict: bool = False) -> dict:
+        """
+        strict=True re-raises LLM errors instead of returning a placeholder, so batch jobs
+        can tell a failed professor apart from one without reviews.
+        """
+        llm = get_llm()
         if not search_content:
             return {"rating": 0.0, "summary": "No reviews found."}
             
@@ -96,41 +118,31 @@ class RMPAggregator:
         Summary: [2-3 sentences summary]
         """
         
-        # --- 自动重试机制 (针对 429 错误) ---
-        max_retries = 3
-        base_wait_time = 5 
-
-        for attempt in range(max_retries):
-            try:
-                response = self.model.generate_content(prompt)
-                result = response.text.strip()
-                
-                # 简单解析逻辑
-                lines = result.split('\n')
-                rating = 0.0
-                summary = result
-                
-                for line in lines:
-                    if line.startswith("Rating:"):
-                        try:
-                            rating_str = line.split(":")[1].strip().split("/")[0]
-                            clean_rating = ''.join(filter(lambda x: x.isdigit() or x == '.', rating_str))
-                            rating = float(clean_rating)
-                        except:
-                            pass
-                    elif line.startswith("Summary:"):
-                        summary = line.split(":", 1)[1].strip()
-                
-                return {"rating": rating, "summary": summary}
-
-            except exceptions.ResourceExhausted:
-                # 遇到 429 错误：等待并重试
-                wait_time = base_wait_time * (2 ** attempt) 
-                print(f"\n⏳ 触发 API 速率限制。等待 {wait_time} 秒后重试 (模型: {self.model_name})...")
-                time.sleep(wait_time)
+        # 429 重试/退避由全局限流器统一处理 (src/engine/concurrency.py)
+        try:
+            result = llm.generate(self.model_name, prompt).strip()
+            
+            # 简单解析逻辑
+            lines = result.split('\n')
+            rating = 0.0
+            summary = result
             
-            except Exception as e:
-                print(f"\n⚠️ 未知错误: {e}")
-                break 
+            for line in lines:
+                if line.startswith("Rating:"):
+                    try:
+                        rating_str = line.split(":")[1].strip().split("/")[0]
+                        clean_rating = ''.join(filter(lambda x: x.isdigit() or x == '.', rating_str))
+                        rating = float(clean_rating)
+                    except:
+                        pass
+                elif line.startswith("Summary:"):
+                    summary = line.split(":", 1)[1].strip()
+            
+            return {"rating": rating, "summary": summary}
+
+        except Exception as e:
+            if strict:
+                raise
+            print(f"\n⚠️ 未知错误: {e}")
         
         return {"rating": 0.0, "summary": "Error retrieving summary."}
\ No newline at end of file
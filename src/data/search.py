@@ -0,0 +1,83 @@
+import os
+import threading
+from collections import Counter
+from typing import Any, Dict, Optional
+from tavily import TavilyClient
+
+from src.data.cache import SQLiteCache, get_cache, make_key
+from src.engine.concurrency import SingleFlight, rate_limited_call
+
+# How long a search result stays fresh, per kind of source (seconds).
+SOURCE_TTLS = {
+    "rmp": 3 * 24 * 3600,           # RMP pages change slowly
+    "reddit": 6 * 3600,             # Discussions move fast
+    "requirements": 7 * 24 * 3600,  # Degree requirements change once a year at most
+    "catalog": 2 * 24 * 3600,       # Official course catalog / syllabus lookups
+    "default": 24 * 3600,
+}
+
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "20000"))
+
+_in_flight = SingleFlight()
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+class CachedSearchClient:
+    """
+    Drop-in wrapper around TavilyClient.search backed by a persistent, TTL-bounded cache.
+    Results are keyed on the normalized (query, search_depth, max_results) tuple.
+    """
+    def __init__(self, api_key: str, cache: Optional[SQLiteCache] = None):
+        self.client = TavilyClient(api_key=api_key)
+        self.cache = cache or get_cache("search", max_entries=SEARCH_CACHE_MAX_ENTRIES)
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def search(self, query: str, search_depth: str = "basic", max_results: int = 5, source: str = "default", **kwargs) -> Dict[str, Any]:
+        """
+        Same contract as TavilyClient.search. `source` selects the TTL (see SOURCE_TTLS).
+        """
+        key = make_key(normalize_query(query), search_depth, max_results, kwargs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.hits[source] += 1
+            return cached
+
+        self.misses[source] += 1
+
+        def _fetch():
+            result = rate_limited_call(
+                "tavily",
+                lambda: self.client.search(query=query, search_depth=search_depth, max_results=max_results, **kwargs)
+            )
+            self.cache.set(key, result, SOURCE_TTLS.get(source, SOURCE_TTLS["default"]))
+            return result
+
+        # Identical searches already in flight (e.g. another session) share that request
+        return _in_flight.do(key, _fetch)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": dict(self.hits),
+            "misses": dict(self.misses),
+            "coalesced": _in_flight.coalesced,
+            "cache": self.cache.stats(),
+        }
+
+
+_clients: Dict[str, CachedSearchClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_search_client(api_key: Optional[str] = None) -> CachedSearchClient:
+    """
+    Returns the process-wide CachedSearchClient for an API key (defaults to TAVILY_API_KEY).
+    """
+    api_key = api_key or os.getenv("TAVILY_API_KEY")
+    with _clients_lock:
+        if api_key not in _clients:
+            _clients[api_key] = CachedSearchClient(api_key)
+        return _clients[api_key]
@@ -1,47 +1,65 @@
+import asyncio
 import os
-import google.generativeai as genai
 from src.vector_store.store import CourseVectorStore
+from src.engine.context import CONTEXT_BUDGETS, pack_text
+from src.engine.llm import get_llm
+from src.engine.model_pool import resolve_model
 from typing import List, Dict, Any
 
-from src.data.rmp import RMPSearcher, RMPAggregator
+from src.data.rmp import RMPSearcher, RMPAggregator, AsyncRMPSearcher
+from src.data.professor_index import get_professor_index
+from src.data.name_resolver import get_name_resolver
 import json
 
 class CourseAdvisor:
     def __init__(self):
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-        
-        # Try models in order of preference
-        models_to_try = ['gemini-2.0-flash-lite', 'gemini-flash-latest']
-        self.model = None
-        for model_name in models_to_try:
-            try:
-                test_model = genai.GenerativeModel(model_name)
-                test_model.generate_content("Test")
-                self.model = test_model
-                break
-            except Exception:
-                continue
-        if not self.model:
-            self.model = genai.GenerativeModel('gemini-2.0-flash-lite')
+        # Try models in order of preference (availability is probed once per process)
+        self.model_name = resolve_model(['gemini-2.0-flash-lite', 'gemini-flash-latest'], os.getenv("GOOGLE_API_KEY"))
 
+        self.llm = get_llm()
         self.searcher = RMPSearcher()
+        self.async_searcher = AsyncRMPSearcher(self.searcher)
         self.aggregator = RMPAggregator()
         
-    def analyze_course(self, course_info: Dict[str, str], user_profile: Dict[str, Any]) -> str:
+    async def analyze_course(self, course_info: Dict[str, str], user_profile: Dict[str, Any]) -> str:
         """
         Analyzes a single course based on extracted info and user profile.
+        A coroutine: the caller owns the event loop, e.g. asyncio.run(advisor.analyze_course(...)),
+        or asyncio.gather() over several courses.
         """
         course_id = course_info.get('course_id', 'Unknown Course')
         instructor = course_info.get('instructor', 'Staff')
+        if instructor and instructor != "Staff":
+            match = get_name_resolver().resolve(instructor)
+            if match and match.method != "fuzzy":
+                instructor = match.name
+            elif match:
+                print(f"🔤 '{instructor}' may be {match.name} ({match.score:.2f}); keeping the name as given.")
         
         print(f"🕵️ Analyzing {course_id} with {instructor}...")
         
         # 1. Reality Check (Search)
         rmp_content = ""
+        search_professor = None
         if instructor and instructor != "Staff":
-            rmp_content = self.searcher.search_professor(instructor, "NYU")
+            # Indexed profiles are a local lookup; only unknown / stale professors hit the network
+            profile = get_professor_index().get(instructor)
+            if profile and profile.has_data:
+                rmp_content = (
+                    f"Overall Quality {profile.rating}/5, Difficulty {profile.difficulty}/5, "
+                    f"{profile.would_take_again}% would take again ({profile.num_ratings} ratings). {profile.summary}"
+                )
+            else:
+                search_professor = instructor
             
-        reddit_content = self.searcher.search_reddit(course_id)
+        # RMP and Reddit lookups run concurrently
+        searched_rmp, reddit_content = await self.async_searcher.search_course(search_professor, course_id, "NYU")
+        rmp_content = rmp_content or searched_rmp
+
+        # Keep the most relevant, non-duplicate passages; half of the budget each
+        budget = CONTEXT_BUDGETS["advisor"] // 2
+        rmp_content = pack_text(rmp_content, course_id, instructor, budget)
+        reddit_content = pack_text(reddit_content, course_id, instructor, budget)
         
         # 2. Generate Advice
         prompt = f"""
@@ -57,8 +75,8 @@ class CourseAdvisor:
         - Avoid: {', '.join(user_profile.get('avoid', []))}
         
         Real-world Feedback (Search Results):
-        [Rate My Professor]: {rmp_content[:1000] if rmp_content else "No RMP found."}
-        [Reddit/Online Discussions]: {reddit_content[:1000] if reddit_content else "No Reddit discussions found."}
+        [Rate My Professor]: {rmp_content or "No RMP found."}
+        [Reddit/Online Discussions]: {reddit_content or "No Reddit discussions found."}
         
         Instructions:
         1. **Vibe Check**: Is this course a "Gem" (神课) or a "Pitfall" (坑)?
@@ -70,12 +88,13 @@ class CourseAdvisor:
         """
         
         try:
-            response = self.model.generate_content(prompt)
-            return response.text
+            # The Gemini client is blocking; keep it off the event loop
+            return await asyncio.get_running_loop().run_in_executor(None, self.llm.generate, self.model_name, prompt)
         except Exception as e:
             return f"Error generating advice: {e}"
 
 if __name__ == "__main__":
     # Simple test
     advisor = CourseAdvisor()
-    print(advisor.get_advice("I want a course with a good professor for AI."))
+    course = {"course_id": "CS-GY 6613", "name": "Artificial Intelligence", "instructor": "Staff"}
+    print(asyncio.run(advisor.analyze_course(course, {"goal": "Job Seeking", "avoid": []})))
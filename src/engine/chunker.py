@@ -0,0 +1,125 @@
+import os
+from typing import Callable, Dict, List, Optional, Sequence
+
+from src.engine.concurrency import run_concurrently
+from src.engine.local_parser import COURSE_CODE_RE, TITLE_SEPARATORS
+
+PARSE_CHUNK_CHARS = int(os.getenv("PARSE_CHUNK_CHARS", "12000"))
+PARSE_CHUNK_OVERLAP_LINES = 2
+PARSE_MAX_WORKERS = int(os.getenv("PARSE_MAX_WORKERS", "4"))
+
+
+def _is_record_start(line: str) -> bool:
+    stripped = line.strip()
+    match = COURSE_CODE_RE.search(stripped)
+    return bool(match) and not stripped[:match.start()].strip(TITLE_SEPARATORS)
+
+
+def split_records(text: str) -> List[List[str]]:
+    """
+    Splits text into records (lists of lines). A record starts at a line that begins with a
+    course code; text without any codes falls back to blank-line separated paragraphs.
+    """
+    lines = text.splitlines()
+    has_codes = any(_is_record_start(l) for l in lines)
+    records: List[List[str]] = []
+    current: List[str] = []
+    for line in lines:
+        boundary = _is_record_start(line) if has_codes else not line.strip()
+        if boundary and current:
+            records.append(current)
+            current = []
+        if line.strip() or has_codes:
+            current.append(line)
+    if current:
+        records.append(current)
+    return [r for r in records if any(l.strip() for l in r)]
+
+
+def chunk_course_text(text: str, max_chars: int = PARSE_CHUNK_CHARS, overlap_lines: int = PARSE_CHUNK_OVERLAP_LINES) -> List[str]:
+    """
+    Packs whole records into chunks of at most ~max_chars. Each chunk after the first repeats
+    the last few lines of the previous one so a record cut at a bad boundary is still seen whole.
+    Records longer than max_chars are split by line.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    fresh = 0  # lines added since the last flush (overlap lines don't count)
+
+    def add(line: str):
+        nonlocal size, fresh
+        current.append(line)
+        size += len(line) + 1
+        fresh += 1
+
+    def flush():
+        nonlocal current, size, fresh
+        chunks.append("\n".join(current))
+        current = current[-overlap_lines:] if overlap_lines else []
+        size = sum(len(l) + 1 for l in current)
+        fresh = 0
+
+    for record in split_records(text):
+        record_size = sum(len(l) + 1 for l in record)
+        if fresh and size + record_size > max_chars:
+            flush()
+        if record_size <= max_chars:
+            for line in record:
+                add(line)
+            continue
+        for line in record:
+            line = line[:max_chars]
+            if fresh and size + len(line) + 1 > max_chars:
+                flush()
+            add(line)
+
+    if fresh:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _norm(value) -> str:
+    return " ".join(str(value or "").lower().split())
+
+
+def merge_courses(course_lists: Sequence[List[Dict]], code_key: str = "code", professor_key: str = "professor", placeholders: Sequence[str] = ("tbd", "staff", "")) -> List[Dict]:
+    """
+    Merges per-chunk results, deduplicating by (course code, professor).
+    A placeholder professor entry is dropped when the same code also appears with a real name.
+    """
+    merged: Dict[tuple, Dict] = {}
+    for courses in course_lists:
+        for course in courses:
+            if not isinstance(course, dict) or not course.get(code_key):
+                continue
+            key = (_norm(course.get(code_key)), _norm(course.get(professor_key)))
+            existing = merged.get(key)
+            # Keep the more complete record (e.g. the one with a longer title)
+            if existing is None or len(str(course.get("name", ""))) > len(str(existing.get("name", ""))):
+                merged[key] = course
+
+    named_codes = {code for code, prof in merged if prof not in placeholders}
+    return [c for (code, prof), c in merged.items() if prof not in placeholders or code not in named_codes]
+
+
+def parse_in_chunks(text: str, parse_chunk: Callable[[str], List[Dict]], on_chunk: Optional[Callable[[List[Dict], int, int], None]] = None, max_chars: int = PARSE_CHUNK_CHARS, max_workers: int = PARSE_MAX_WORKERS, code_key: str = "code", professor_key: str = "professor") -> List[Dict]:
+    """
+    Parses chunks concurrently with parse_chunk(chunk_text) and merges the results.
+    on_chunk(merged_so_far, chunks_done, chunks_total) is called from the caller's thread
+    each time a chunk finishes, so it may safely update the UI.
+    """
+    chunks = chunk_course_text(text, max_chars=max_chars)
+    results: List[List[Dict]] = []
+    done = 0
+    for event, _, payload in run_concurrently(chunks, lambda chunk, status: parse_chunk(chunk), max_workers=max_workers):
+        if event == "status":
+            continue
+        done += 1
+        if event == "done" and payload:
+            results.append(payload)
+        elif event == "error":
+            print(f"Chunk parse failed: {payload}")
+        if on_chunk:
+            on_chunk(merge_courses(results, code_key, professor_key), done, len(chunks))
+    return merge_courses(results, code_key, professor_key)
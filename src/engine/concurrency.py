@@ -0,0 +1,366 @@
+import asyncio
+import os
+import queue
+import random
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Max number of in-flight requests per provider, shared by every thread in the process.
+PROVIDER_LIMITS = {
+    "tavily": int(os.getenv("TAVILY_MAX_CONCURRENCY", "4")),
+    "gemini": int(os.getenv("GEMINI_MAX_CONCURRENCY", "4")),
+}
+
+_slots: Dict[str, threading.BoundedSemaphore] = {}
+_slots_lock = threading.Lock()
+
+
+def _get_slot(provider: str) -> threading.BoundedSemaphore:
+    with _slots_lock:
+        if provider not in _slots:
+            _slots[provider] = threading.BoundedSemaphore(PROVIDER_LIMITS.get(provider, 4))
+        return _slots[provider]
+
+
+@contextmanager
+def provider_slot(provider: str):
+    """
+    Blocks until a concurrency slot for the given provider is free.
+    rate_limited_call() already takes a slot; use this only for calls that bypass it.
+    """
+    slot = _get_slot(provider)
+    slot.acquire()
+    try:
+        yield
+    finally:
+        slot.release()
+
+
+# Requests per minute, per provider and (optionally) per model. Models without an entry
+# only share the provider bucket.
+PROVIDER_RPM = {
+    "tavily": float(os.getenv("TAVILY_RPM", "100")),
+    "gemini": float(os.getenv("GEMINI_RPM", "60")),
+}
+MODEL_RPM = {
+    "gemini-2.0-flash-lite": float(os.getenv("GEMINI_FLASH_LITE_RPM", "30")),
+    "gemini-1.5-flash": float(os.getenv("GEMINI_15_FLASH_RPM", "15")),
+}
+MAX_RETRIES = 5
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 60.0
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens per second, bursts up to `capacity`.
+    pause() empties the bucket for a while, e.g. after the server told us to back off.
+    """
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        # Returns how long the caller must wait; 0 means a token was taken.
+        with self._lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        while True:
+            wait = self._reserve()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            # No burst right after a pause: callers trickle back in at the refill rate
+            self.tokens = min(self.tokens, 1.0)
+
+
+class RateLimiter:
+    """
+    Process-wide throttle for every Gemini / Tavily call: concurrency slot, provider and
+    model token buckets, and retry with jittered exponential backoff on 429s.
+    """
+    def __init__(self):
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self.waiting: Dict[str, int] = {}
+        self.in_flight: Dict[str, int] = {}
+        self.throttled: Dict[str, int] = {}
+
+    def _bucket(self, key: str, rpm: float) -> TokenBucket:
+        with self._lock:
+            if key not in self._buckets:
+                # Allow a small burst (10s worth of quota) so idle periods aren't wasted
+                rate = rpm / 60.0
+                self._buckets[key] = TokenBucket(rate, capacity=max(1.0, rate * 10))
+            return self._buckets[key]
+
+    def _buckets_for(self, provider: str, model: Optional[str]) -> List[TokenBucket]:
+        buckets = [self._bucket(provider, PROVIDER_RPM.get(provider, 60.0))]
+        if model:
+            short = model[len("models/"):] if model.startswith("models/") else model
+            if short in MODEL_RPM:
+                buckets.append(self._bucket(f"{provider}:{short}", MODEL_RPM[short]))
+        return buckets
+
+    def _count(self, counter: Dict[str, int], provider: str, delta: int):
+        with self._lock:
+            counter[provider] = counter.get(provider, 0) + delta
+
+    def call(self, provider: str, fn: Callable[[], Any], model: Optional[str] = None, max_retries: int = MAX_RETRIES,
+             retry_on: Optional[Callable[[Exception], bool]] = None) -> Any:
+        """
+        Runs fn() under the provider's limits and retries rate-limit errors, plus any error
+        retry_on(e) accepts (e.g. is_transient_error). Other exceptions are raised immediately.
+        """
+        buckets = self._buckets_for(provider, model)
+        for attempt in range(max_retries):
+            self._count(self.waiting, provider, 1)
+            try:
+                for bucket in buckets:
+                    bucket.acquire()
+                slot = _get_slot(provider)
+                slot.acquire()
+            finally:
+                self._count(self.waiting, provider, -1)
+
+            self._count(self.in_flight, provider, 1)
+            try:
+                return fn()
+            except Exception as e:
+                throttled = is_rate_limit_error(e)
+                if not (throttled or (retry_on is not None and retry_on(e))) or attempt == max_retries - 1:
+                    raise
+                error = e
+            finally:
+                self._count(self.in_flight, provider, -1)
+                slot.release()
+
+            # Honour the server's hint if there is one, otherwise full-jitter exponential backoff.
+            # Jitter keeps concurrent callers from retrying in lockstep.
+            hint = retry_after_seconds(error)
+            delay = hint if hint is not None else random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+            if throttled:
+                # Only throttling slows everyone down; a transient error just retries this call
+                self._count(self.throttled, provider, 1)
+                for bucket in buckets:
+                    bucket.pause(delay)
+            reason = "rate limited" if throttled else "failed"
+            print(f"⏳ {provider} {reason} ({type(error).__name__}), retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries})")
+            time.sleep(delay + random.uniform(0, 0.5))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queue_depth": dict(self.waiting),
+                "in_flight": dict(self.in_flight),
+                "throttled": dict(self.throttled),
+            }
+
+
+# Quota windows that will not reset within any retry budget
+DAILY_QUOTA_RE = re.compile(r"per[ _]?day|daily", re.IGNORECASE)
+# Billing / plan limits; waiting does not help either
+BILLING_RE = re.compile(r"billing|plan limit|upgrade your plan", re.IGNORECASE)
+TRANSIENT_STATUS = {500, 502, 503, 504}
+TRANSIENT_ERRORS = ("ServiceUnavailable", "InternalServerError", "DeadlineExceeded", "TimeoutError", "Timeout",
+                    "ReadTimeout", "ConnectTimeout", "ConnectionError", "RemoteDisconnected")
+
+
+def _status_code(e: Exception) -> Optional[int]:
+    code = getattr(e, "code", None)
+    if isinstance(code, int):
+        return code
+    return getattr(getattr(e, "response", None), "status_code", None)
+
+
+def is_quota_error(e: Exception) -> bool:
+    """
+    Any throttling or quota error (429, ResourceExhausted, usage limit), whether or not a retry can help.
+    """
+    if type(e).__name__ in ("ResourceExhausted", "TooManyRequests", "UsageLimitExceededError"):
+        return True
+    if _status_code(e) == 429:
+        return True
+    message = str(e).lower()
+    return "429" in message or "rate limit" in message or "quota" in message
+
+
+def is_rate_limit_error(e: Exception) -> bool:
+    """
+    A quota error worth retrying with backoff: any 429 / ResourceExhausted, including Gemini's bare
+    "Resource has been exhausted (e.g. check quota)" throttle. Daily quotas and billing / plan limits fail fast;
+    a billing mention next to a retry hint is Gemini's free-tier per-minute message, which is retried.
+    """
+    if not is_quota_error(e) or type(e).__name__ == "UsageLimitExceededError":
+        return False
+    message = str(e)
+    if DAILY_QUOTA_RE.search(message):
+        return False
+    return not BILLING_RE.search(message) or retry_after_seconds(e) is not None
+
+
+def is_transient_error(e: Exception) -> bool:
+    """
+    Server-side hiccups (5xx, timeouts, dropped connections) that usually succeed on retry.
+    """
+    if _status_code(e) in TRANSIENT_STATUS or type(e).__name__ in TRANSIENT_ERRORS:
+        return True
+    message = str(e).lower()
+    return any(marker in message for marker in ("timed out", "temporarily unavailable", "503", "502", "500 internal"))
+
+
+def retry_after_seconds(e: Exception) -> Optional[float]:
+    """
+    Extracts a retry-after hint from a Retry-After header or a "retry in 17s" /
+    "retry_delay { seconds: 17 }" style message.
+    """
+    headers = getattr(getattr(e, "response", None), "headers", None) or {}
+    value = headers.get("Retry-After") if hasattr(headers, "get") else None
+    if value:
+        try:
+            return min(BACKOFF_MAX, float(value))
+        except ValueError:
+            pass
+    message = str(e)
+    match = (re.search(r"retry(?:[ _]?(?:in|after|delay))?[^0-9]{0,20}?(\d+(?:\.\d+)?)\s*(?:s|secs?|seconds?)\b", message, re.IGNORECASE)
+             or re.search(r"retry_delay\s*\{\s*seconds:\s*(\d+)", message))
+    if match:
+        return min(BACKOFF_MAX, float(match.group(1)))
+    return None
+
+
+_limiter = RateLimiter()
+
+
+def rate_limited_call(provider: str, fn: Callable[[], Any], model: Optional[str] = None, max_retries: int = MAX_RETRIES,
+                      retry_on: Optional[Callable[[Exception], bool]] = None) -> Any:
+    """
+    Shared entry point: every network call to Gemini / Tavily should go through this.
+    """
+    return _limiter.call(provider, fn, model=model, max_retries=max_retries, retry_on=retry_on)
+
+
+def limiter_stats() -> Dict[str, Any]:
+    return _limiter.stats()
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight calls: the first caller for a key runs fn, everyone who
+    asks for the same key meanwhile waits on the same future. Works across threads
+    (Streamlit sessions) and asyncio callers alike.
+    """
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        with self._lock:
+            if key in self._calls:
+                self.coalesced += 1
+                return self._calls[key], False
+            future: Future = Future()
+            self._calls[key] = future
+            return future, True
+
+    def _run(self, key: str, future: Future, fn: Callable[[], Any]):
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                self._calls.pop(key, None)
+            future.set_exception(e)
+            return
+        with self._lock:
+            self._calls.pop(key, None)
+        future.set_result(result)
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        future, leader = self._join(key)
+        if leader:
+            self._run(key, future, fn)
+        return future.result()
+
+    async def do_async(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        Same as do(), but the leader runs fn in the default executor and followers
+        await the shared future without tying up a thread.
+        """
+        future, leader = self._join(key)
+        if leader:
+            asyncio.get_running_loop().run_in_executor(None, self._run, key, future, fn)
+        return await asyncio.wrap_future(future)
+
+
+class StatusRelay:
+    """
+    Stand-in for a Streamlit status container that can be used from worker threads.
+    Messages are queued and written by the main script thread.
+    """
+    def __init__(self, events: queue.Queue, index: int):
+        self.events = events
+        self.index = index
+
+    def write(self, message: str):
+        self.send("status", message)
+
+    def send(self, event: str, payload: Any):
+        """
+        Queues any other event (e.g. a partial result) for the main thread.
+        """
+        self.events.put((event, self.index, payload))
+
+
+def run_concurrently(items: List[Any], worker: Callable[[Any, StatusRelay], Any], max_workers: int = 6) -> Iterator[Tuple[str, int, Any]]:
+    """
+    Runs worker(item, status) for every item on a bounded thread pool.
+    Yields (event, index, payload) tuples as they happen:
+    - ("status", i, message) for progress messages written by the worker
+    - (event, i, payload) for anything else the worker sent with status.send()
+    - ("done", i, result) when item i finished
+    - ("error", i, exception) when item i raised
+    """
+    if not items:
+        return
+
+    events: queue.Queue = queue.Queue()
+
+    def _run(index: int, item: Any):
+        try:
+            result = worker(item, StatusRelay(events, index))
+            events.put(("done", index, result))
+        except Exception as e:
+            events.put(("error", index, e))
+
+    pending = len(items)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as executor:
+        for i, item in enumerate(items):
+            executor.submit(_run, i, item)
+
+        while pending:
+            event = events.get()
+            if event[0] in ("done", "error"):
+                pending -= 1
+            yield event
@@ -0,0 +1,160 @@
+import os
+import re
+import zlib
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+# Token budget for the evidence part of each prompt (rough estimate: 4 characters per token).
+CONTEXT_BUDGETS = {
+    "judge": int(os.getenv("JUDGE_CONTEXT_TOKENS", "3000")),
+    "analysis": int(os.getenv("ANALYSIS_CONTEXT_TOKENS", "2500")),
+    "advisor": int(os.getenv("ADVISOR_CONTEXT_TOKENS", "600")),
+    "requirements": int(os.getenv("REQUIREMENTS_CONTEXT_TOKENS", "800")),
+}
+CHARS_PER_TOKEN = 4
+PASSAGE_MAX_CHARS = 700
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 64
+NEAR_DUPLICATE_THRESHOLD = 0.7
+
+# Words that usually mark useful review evidence (stats, workload, grading)
+EVIDENCE_TERMS = (
+    "rating", "quality", "difficulty", "would take again", "workload", "hours", "exam", "midterm",
+    "final", "grading", "curve", "homework", "project", "lecture", "assignment", "recommend",
+)
+
+_PRIME = (1 << 61) - 1
+_SEEDS = [((i * 0x9E3779B1 + 1) % _PRIME, (i * 0x85EBCA77 + 7) % _PRIME) for i in range(1, NUM_PERMUTATIONS + 1)]
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def split_passages(text: str, max_chars: int = PASSAGE_MAX_CHARS) -> List[str]:
+    """
+    Splits text on blank lines, then packs sentences of long paragraphs into passages of at most max_chars.
+    """
+    passages = []
+    for paragraph in re.split(r"\n\s*\n", text or ""):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            passages.append(paragraph)
+            continue
+        current = ""
+        for sentence in _SENTENCE_RE.split(paragraph):
+            if current and len(current) + len(sentence) + 1 > max_chars:
+                passages.append(current)
+                current = ""
+            current = f"{current} {sentence}".strip()
+            while len(current) > max_chars:
+                passages.append(current[:max_chars])
+                current = current[max_chars:]
+        if current:
+            passages.append(current)
+    return passages
+
+
+def _compact_code(code: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", (code or "").lower())
+
+
+def relevance_score(text: str, course_code: Optional[str] = None, professor: Optional[str] = None) -> float:
+    """
+    Heuristic relevance of a passage: mentions of the course code and professor,
+    plus review vocabulary, with a mild penalty for very short passages.
+    """
+    lowered = text.lower()
+    score = 0.0
+
+    code = _compact_code(course_code)
+    if code and code in _compact_code(text):
+        score += 3.0
+
+    if professor:
+        parts = [p for p in _WORD_RE.findall(professor.lower()) if len(p) > 1]
+        if parts and " ".join(parts) in " ".join(_WORD_RE.findall(lowered)):
+            score += 3.0
+        elif parts and parts[-1] in lowered:
+            score += 1.5
+
+    score += min(3.0, 0.5 * sum(1 for term in EVIDENCE_TERMS if term in lowered))
+    if re.search(r"\b[0-5](?:\.\d)?\s*/\s*5\b|\b\d{1,3}\s*%", text):
+        score += 1.0
+    if len(text) < 80:
+        score -= 1.0
+    return score
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))} if words else set()
+    return {zlib.crc32(" ".join(words[i:i + size]).encode("utf-8")) for i in range(len(words) - size + 1)}
+
+
+def minhash(shingle_set: set) -> Tuple[int, ...]:
+    if not shingle_set:
+        return tuple([_PRIME] * NUM_PERMUTATIONS)
+    return tuple(min((a * s + b) % _PRIME for s in shingle_set) for a, b in _SEEDS)
+
+
+def estimated_similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    """
+    Estimated Jaccard similarity of the shingle sets behind two MinHash signatures.
+    """
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+class Snippet:
+    __slots__ = ("text", "source", "score", "position")
+
+    def __init__(self, text: str, source: Optional[str] = None, score: float = 0.0, position: int = 0):
+        self.text = text
+        self.source = source
+        self.score = score
+        self.position = position
+
+
+def select_evidence(items: Iterable[Tuple[str, Optional[str]]], course_code: Optional[str] = None, professor: Optional[str] = None,
+                    budget_tokens: int = CONTEXT_BUDGETS["analysis"]) -> List[Snippet]:
+    """
+    Takes (text, source) pairs, splits them into passages, drops near-duplicates and packs the most
+    relevant passages into budget_tokens. Returns the chosen passages, most relevant first.
+    """
+    candidates = []
+    for text, source in items:
+        for passage in split_passages(text):
+            candidates.append(Snippet(passage, source, relevance_score(passage, course_code, professor), len(candidates)))
+    # Highest score first; earlier passages win ties (search results come ranked)
+    candidates.sort(key=lambda s: (-s.score, s.position))
+
+    chosen: List[Snippet] = []
+    signatures: List[Tuple[int, ...]] = []
+    seen = set()
+    used = 0
+    for snippet in candidates:
+        cost = estimate_tokens(snippet.text)
+        key = snippet.text.lower()
+        if used + cost > budget_tokens or key in seen:
+            continue
+        seen.add(key)
+        signature = minhash(shingles(snippet.text))
+        if any(estimated_similarity(signature, other) >= NEAR_DUPLICATE_THRESHOLD for other in signatures):
+            continue
+        chosen.append(snippet)
+        signatures.append(signature)
+        used += cost
+    return chosen
+
+
+def pack_text(text: str, course_code: Optional[str] = None, professor: Optional[str] = None, budget_tokens: int = CONTEXT_BUDGETS["judge"]) -> str:
+    """
+    select_evidence() for a single block of text; text that already fits is returned unchanged.
+    """
+    if not text or estimate_tokens(text) <= budget_tokens:
+        return text
+    return "\n\n".join(s.text for s in select_evidence([(text, None)], course_code, professor, budget_tokens))
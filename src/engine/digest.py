@@ -0,0 +1,227 @@
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from src.data.analysis_store import ANALYSIS_RESULT_TTL
+from src.data.cache import SQLiteCache, get_cache, make_key
+from src.data.professor_index import normalize_name
+from src.engine.concurrency import SingleFlight
+from src.engine.json_stream import IncrementalJSONParser
+from src.engine.llm import get_llm
+
+# Sidebar goals, without their Chinese labels
+GOALS = ("Job Seeking", "PhD/Research", "Easy A", "Hardcore Tech")
+
+# What each goal optimizes for; the only goal-specific input of the rendering step
+GOAL_FOCUS = {
+    "Job Seeking": "interview prep, resume-worthy projects, time left for LeetCode and applications",
+    "PhD/Research": "theory depth, research exposure, the professor as a potential advisor or recommender",
+    "Easy A": "low workload, lenient grading, predictable exams",
+    "Hardcore Tech": "technical depth and rigor, hard systems / ML projects, skills that compound",
+}
+
+# Render all goal views in one call, so switching the sidebar goal later costs nothing
+ANALYSIS_ALL_GOALS = os.getenv("ANALYSIS_ALL_GOALS", "1") == "1"
+# Bump when the digest prompt or schema changes
+DIGEST_VERSION = 1
+
+# Analysis JSON keys that come from the (goal-independent) digest vs. from a goal view
+DIGEST_KEYS = ("data_source", "deep_dive", "contradiction_audit")
+VIEW_KEYS = ("persona_classification", "suitability", "strategic_planning", "opportunity_cost")
+
+DIGEST_INSTRUCTION = """
+You condense course reviews into facts. Only state what the evidence supports; if it is sparse, say "Data Sparse".
+Be specific (hours/week, exam format, languages) and terse. No advice, no opinions about who should take the course.
+"""
+
+ADVISOR_INSTRUCTION = """
+You are a sharp, pragmatic academic advisor for NYU Tandon students. Never say "good course" / "bad course":
+say good for whom, under what conditions, and why. No generic advice ("study hard"); model trade-offs
+(coursework vs job search vs research) explicitly. Use only the facts in the digest; never invent data.
+"""
+
+VIEW_SCHEMA = """{
+    "persona_classification": "Job Seeking" | "Research Oriented" | "GPA Farming" | "Undecided",
+    "suitability": {"best_for": ["string"], "not_for": ["string"], "risk_factors": ["string"]},
+    "strategic_planning": {"roadmap_context": "string", "credit_advice": "string", "alternatives": ["string"]},
+    "opportunity_cost": {"trade_offs": "string", "warning": "string"}
+}"""
+
+
+def goal_name(goal: Optional[str]) -> str:
+    """
+    "Job Seeking (找工)" -> "Job Seeking".
+    """
+    return (goal or "").split(" (")[0].strip() or "General"
+
+
+def merge_view(digest: Dict[str, Any], view: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Full analysis JSON (the schema render_analysis_card() expects) from a digest and one goal view.
+    """
+    result = {key: digest.get(key) for key in DIGEST_KEYS}
+    result.update({key: view.get(key) for key in VIEW_KEYS})
+    return result
+
+
+def goals_to_render(goal: str) -> List[str]:
+    """
+    The current goal first (it streams into the card), then the others if ANALYSIS_ALL_GOALS.
+    """
+    if not ANALYSIS_ALL_GOALS:
+        return [goal]
+    return [goal] + [g for g in GOALS if g != goal]
+
+
+class EvidenceDigester:
+    """
+    Two-stage course analysis.
+    1. digest(): search evidence + RMP stats -> goal-independent facts (deep dive, contradiction audit).
+       One call per course / professor, cached across sessions and goals.
+    2. render_views(): digest + requirements -> goal-specific advice, for one or several goals in a single
+       small prompt. Never sees the raw evidence.
+    """
+    def __init__(self, api_key: Optional[str] = None, cache: Optional[SQLiteCache] = None, ttl: int = ANALYSIS_RESULT_TTL):
+        self.llm = get_llm(api_key)
+        self.model_name = 'gemini-2.0-flash-lite'
+        self.generation_config = {"response_mime_type": "application/json"}
+        self.cache = cache or get_cache("digests")
+        self.ttl = ttl
+        self._in_flight = SingleFlight()
+
+    @staticmethod
+    def key(course_code: str, professor: str, school: Optional[str]) -> str:
+        code = " ".join((course_code or "").upper().split())
+        return make_key("digest", DIGEST_VERSION, code, normalize_name(professor or ""), " ".join((school or "").lower().split()))
+
+    def get(self, course_code: str, professor: str, school: Optional[str]) -> Optional[Dict[str, Any]]:
+        return self.cache.get(self.key(course_code, professor, school))
+
+    def invalidate(self, course_code: str, professor: str, school: Optional[str]):
+        self.cache.delete(self.key(course_code, professor, school))
+
+    def _generate_json(self, prompt: str, system_instruction: str, on_item: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """
+        One JSON-mode call. With on_item, the answer is streamed and on_item(key, value) is called for
+        each top-level key as soon as it is complete.
+        """
+        llm_args = dict(system_instruction=system_instruction, generation_config=self.generation_config)
+        if on_item is None:
+            text = self.llm.generate(self.model_name, prompt, **llm_args)
+        else:
+            parser = IncrementalJSONParser()
+            chunks = []
+            for chunk in self.llm.generate_stream(self.model_name, prompt, **llm_args):
+                chunks.append(chunk)
+                for key, value in parser.feed(chunk):
+                    on_item(key, value)
+            text = "".join(chunks)
+        data = json.loads(text)
+        if isinstance(data, list) and data and isinstance(data[0], dict):
+            data = data[0]
+        if not isinstance(data, dict):
+            raise ValueError("model did not return a JSON object")
+        return data
+
+    def digest(self, course_code: str, professor: str, school: Optional[str], verified_data: Dict[str, Any], context: str,
+               on_section: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """
+        Builds and caches the evidence digest. Concurrent requests for the same course / professor share one call
+        (only the first caller's on_section sees the stream).
+        """
+        key = self.key(course_code, professor, school)
+
+        def _build():
+            prompt = f"""
+            # Course
+            {course_code} - {professor}
+            # RMP Data
+            Rating {verified_data.get('rmp_rating')}, Difficulty {verified_data.get('difficulty')}, Would take again {verified_data.get('would_take_again_percent')}
+            # Reviews
+            {context}
+
+            # Task
+            Extract the facts about this course and professor, and audit whether the rating matches the reviews.
+
+            Output JSON Schema:
+            {{
+                "data_source": "RMP Verified" | "Reddit Consensus" | "AI Estimate",
+                "deep_dive": {{
+                    "workload": "string (Hours/week, intensity)",
+                    "grading": "string (Curve, strictness, distribution)",
+                    "teaching": "string (Style, clarity, engagement)",
+                    "exams": "string (Format, difficulty, open/closed book)",
+                    "projects": "string (Individual/Group, Languages, Resume value)",
+                    "industry_relevance": "string (Skills, Real-world alignment)"
+                }},
+                "contradiction_audit": {{"flag": boolean, "details": "string"}},
+                "key_facts": ["string (other facts worth knowing, with source site)"]
+            }}
+            """
+            data = self._generate_json(prompt, DIGEST_INSTRUCTION, on_section)
+            if not isinstance(data.get("deep_dive"), dict):
+                raise ValueError("digest has no deep_dive")
+            data["rmp"] = {k: verified_data.get(k) for k in ("rmp_rating", "difficulty", "would_take_again_percent", "review_count")}
+            self.cache.set(key, data, self.ttl)
+            return data
+
+        return self._in_flight.do(key, _build)
+
+    def render_views(self, digest: Dict[str, Any], course_code: str, professor: str, goals: Sequence[str], req_context: str,
+                     on_view: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                     on_section: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Goal-specific advice for every goal in goals, in one call: {goal: view}.
+        on_view(goal, view) is called as each goal's view completes; on_section(key, value) for the
+        keys of the first goal's view, so its card can fill in before the other goals are done.
+        """
+        focus = "\n".join(f"- {goal}: {GOAL_FOCUS.get(goal, 'balanced, exploratory')}" for goal in goals)
+        facts = {key: digest.get(key) for key in ("rmp", "deep_dive", "contradiction_audit", "key_facts")}
+        prompt = f"""
+        # Course
+        {course_code} - {professor}
+        # Evidence Digest
+        {json.dumps(facts, ensure_ascii=False)}
+        # Requirements
+        {req_context}
+        # Goals (what each one optimizes for)
+        {focus}
+
+        # Task
+        For each goal, judge who this course suits, its risks, where it fits in a 4-semester plan and its opportunity cost.
+
+        Output JSON: an object with one key per goal ({", ".join(json.dumps(g) for g in goals)}), each value following:
+        {VIEW_SCHEMA}
+        """
+
+        def _on_goal(goal, view):
+            if not isinstance(view, dict):
+                return
+            if on_section and goal == goals[0]:
+                for key in VIEW_KEYS:
+                    if key in view:
+                        on_section(key, view[key])
+            if on_view:
+                on_view(goal, view)
+
+        streaming = on_view is not None or on_section is not None
+        data = self._generate_json(prompt, ADVISOR_INSTRUCTION, _on_goal if streaming else None)
+        views = {goal: view for goal, view in data.items() if goal in goals and isinstance(view, dict)}
+        if goals[0] not in views:
+            raise ValueError(f"no advice returned for {goals[0]}")
+        return views
+
+
+_digesters: Dict[Optional[str], EvidenceDigester] = {}
+_digesters_lock = threading.Lock()
+
+
+def get_digester(api_key: Optional[str] = None) -> EvidenceDigester:
+    """
+    Returns the process-wide EvidenceDigester for an API key.
+    """
+    with _digesters_lock:
+        if api_key not in _digesters:
+            _digesters[api_key] = EvidenceDigester(api_key)
+        return _digesters[api_key]
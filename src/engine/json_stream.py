@@ -0,0 +1,96 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class IncrementalJSONParser:
+    """
+    Parses a streamed JSON object and reports each top-level key as soon as its value is complete.
+    Text before the opening brace (e.g. a ```json fence) and after the closing brace is ignored.
+
+        parser = IncrementalJSONParser()
+        for chunk in stream:
+            for key, value in parser.feed(chunk):
+                ...
+    """
+    def __init__(self):
+        self.buffer = ""
+        self.result: Dict[str, Any] = {}
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        # start -> key -> colon -> value -> comma -> key ... -> end
+        self._expect = "start"
+        self._token_start: Optional[int] = None
+        self._key: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self._expect == "end"
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """
+        Adds a chunk and returns the (key, value) pairs completed by it, in order.
+        """
+        self.buffer += text
+        buf = self.buffer
+        completed: List[Tuple[str, Any]] = []
+
+        i = self._pos
+        while i < len(buf) and self._expect != "end":
+            c = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect == "key":
+                        self._key = json.loads(buf[self._token_start:i + 1])
+                        self._token_start = None
+                        self._expect = "colon"
+                    elif self._depth == 1 and self._expect == "value":
+                        self._finish(buf[self._token_start:i + 1], completed)
+            elif self._expect == "start":
+                if c == "{":
+                    self._depth = 1
+                    self._expect = "key"
+            else:
+                if self._depth == 1 and self._expect in ("key", "value") and self._token_start is None and not c.isspace() and c not in ",}":
+                    self._token_start = i
+
+                if c == '"':
+                    self._in_string = True
+                elif c in "{[":
+                    self._depth += 1
+                elif c in "}]":
+                    self._depth -= 1
+                    if self._depth == 1 and self._expect == "value":
+                        self._finish(buf[self._token_start:i + 1], completed)
+                    elif self._depth == 0:
+                        if self._expect == "value" and self._token_start is not None:
+                            # Bare literal (number / true / null) closed by the final brace
+                            self._finish(buf[self._token_start:i], completed)
+                        self._expect = "end"
+                elif self._depth == 1:
+                    if c == ":" and self._expect == "colon":
+                        self._expect = "value"
+                    elif c == ",":
+                        if self._expect == "value" and self._token_start is not None:
+                            self._finish(buf[self._token_start:i], completed)
+                        self._expect = "key"
+            i += 1
+
+        self._pos = i
+        return completed
+
+    def _finish(self, raw: str, completed: List[Tuple[str, Any]]):
+        self._token_start = None
+        self._expect = "comma"
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            return
+        self.result[self._key] = value
+        completed.append((self._key, value))
@@ -1,22 +1,34 @@
-import google.generativeai as genai
 import json
 import re
 import os
+import threading
+from src.engine.context import CONTEXT_BUDGETS, pack_text
+from src.engine.llm import get_llm
+from src.engine.rmp_extractor import RMP_CONFIDENCE_THRESHOLD, extract_rmp_stats
 
 class JudgeAgent:
     def __init__(self, api_key):
-        genai.configure(api_key=api_key)
+        self.llm = get_llm(api_key)
         # Use a fast model for the Judge
-        self.model = genai.GenerativeModel('gemini-2.0-flash-lite', generation_config={"response_mime_type": "application/json"})
+        self.model_name = 'gemini-2.0-flash-lite'
+        self.generation_config = {"response_mime_type": "application/json"}
 
-    def extract_rmp_data(self, raw_text):
+    def extract_rmp_data(self, raw_text, professor=None, course_code=None):
         """
         Extracts structured RMP data from raw search result text.
         Returns a dictionary with rating, difficulty, etc.
+        Structured RMP snippets are read with regexes; the LLM is only called when that is not confident.
+        The text is trimmed to the most relevant passages for the professor / course first.
         """
         if not raw_text:
             return self._empty_result()
 
+        stats = extract_rmp_stats(raw_text)
+        if stats.pop("confidence") >= RMP_CONFIDENCE_THRESHOLD:
+            return stats
+
+        raw_text = pack_text(raw_text, course_code, professor, CONTEXT_BUDGETS["judge"])
+
         prompt = f"""
         You are a Data Extractor. Your job is to extract Rate My Professors (RMP) statistics from the provided text.
         
@@ -28,7 +40,7 @@ class JudgeAgent:
         5. "summary" should be a concise summary of the student reviews found in the text (max 2 sentences).
         
         Text to Analyze:
-        {raw_text[:50000]}
+        {raw_text}
         
         Output JSON Schema:
         {{
@@ -42,8 +54,8 @@ class JudgeAgent:
         """
         
         try:
-            response = self.model.generate_content(prompt)
-            data = json.loads(response.text)
+            text = self.llm.generate(self.model_name, prompt, generation_config=self.generation_config)
+            data = json.loads(text)
             
             # Handle case where model returns a list [ { ... } ]
             if isinstance(data, list):
@@ -70,3 +82,17 @@ class JudgeAgent:
             "has_data": False,
             "review_count": 0
         }
+
+
+_judges = {}
+_judges_lock = threading.Lock()
+
+
+def get_judge(api_key):
+    """
+    Returns the process-wide JudgeAgent for an API key.
+    """
+    with _judges_lock:
+        if api_key not in _judges:
+            _judges[api_key] = JudgeAgent(api_key)
+        return _judges[api_key]
@@ -0,0 +1,134 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from src.data.cache import SQLiteCache, get_cache, make_key
+from src.engine.concurrency import rate_limited_call
+from src.engine import model_pool
+
+LLM_MEMORY_CACHE_SIZE = int(os.getenv("LLM_MEMORY_CACHE_SIZE", "512"))
+LLM_DISK_CACHE_MAX_ENTRIES = int(os.getenv("LLM_DISK_CACHE_MAX_ENTRIES", "20000"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+
+
+def _fingerprint(part: Any) -> Any:
+    """
+    Turns one prompt part into something hashable. Images are hashed by pixel content.
+    """
+    if isinstance(part, str):
+        return part
+    if hasattr(part, "tobytes") and hasattr(part, "size"):
+        return {"image": hashlib.sha256(part.tobytes()).hexdigest(), "size": list(part.size), "mode": getattr(part, "mode", None)}
+    return repr(part)
+
+
+class LLMGateway:
+    """
+    Single entry point for Gemini generate_content calls.
+    Responses are cached by (model, system instruction, generation config, prompt),
+    first in an in-memory LRU, then in an on-disk SQLite tier.
+    """
+    def __init__(self, api_key: Optional[str] = None, disk_cache: Optional[SQLiteCache] = None, memory_size: int = LLM_MEMORY_CACHE_SIZE):
+        self.api_key = api_key or os.getenv("GOOGLE_API_KEY")
+        model_pool.configure(self.api_key)
+        self.disk_cache = disk_cache or get_cache("llm", max_entries=LLM_DISK_CACHE_MAX_ENTRIES)
+        self.memory_size = memory_size
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cache_key(self, model_name: str, contents: Union[str, List[Any]], system_instruction: Optional[str] = None, generation_config: Optional[Dict[str, Any]] = None) -> str:
+        parts = contents if isinstance(contents, list) else [contents]
+        return make_key(model_name, system_instruction, generation_config or {}, [_fingerprint(p) for p in parts])
+
+    def generate(self, model_name: str, contents: Union[str, List[Any]], system_instruction: Optional[str] = None, generation_config: Optional[Dict[str, Any]] = None, cache: bool = True) -> str:
+        """
+        Returns the response text. Pass cache=False for calls that must stay non-deterministic.
+        """
+        key = self.cache_key(model_name, contents, system_instruction, generation_config) if cache else None
+
+        if key:
+            text = self._memory_get(key)
+            if text is not None:
+                return text
+            text = self.disk_cache.get(key)
+            if text is not None:
+                self._memory_put(key, text)
+                return text
+
+        model_pool.configure(self.api_key)
+        model = model_pool.get_model(model_name, generation_config=generation_config, system_instruction=system_instruction)
+        # Throttled per provider and per model; 429s are retried with backoff
+        response = rate_limited_call("gemini", lambda: model.generate_content(contents), model=model_name)
+        text = response.text
+
+        if key:
+            self._memory_put(key, text)
+            self.disk_cache.set(key, text, LLM_CACHE_TTL)
+        return text
+
+    def generate_stream(self, model_name: str, contents: Union[str, List[Any]], system_instruction: Optional[str] = None, generation_config: Optional[Dict[str, Any]] = None, cache: bool = True) -> Iterator[str]:
+        """
+        Same as generate(), but yields the response text in chunks as Gemini produces them.
+        A cache hit is yielded as one chunk; a fully streamed response is cached like generate().
+        """
+        key = self.cache_key(model_name, contents, system_instruction, generation_config) if cache else None
+
+        if key:
+            text = self._memory_get(key)
+            if text is None:
+                text = self.disk_cache.get(key)
+            if text is not None:
+                self._memory_put(key, text)
+                yield text
+                return
+
+        model_pool.configure(self.api_key)
+        model = model_pool.get_model(model_name, generation_config=generation_config, system_instruction=system_instruction)
+        # The request (and any 429) happens when the stream is opened, so only that part is throttled
+        response = rate_limited_call("gemini", lambda: model.generate_content(contents, stream=True), model=model_name)
+
+        parts = []
+        for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunk without text parts (e.g. only finish / safety metadata)
+                continue
+            parts.append(text)
+            yield text
+
+        if key:
+            text = "".join(parts)
+            self._memory_put(key, text)
+            self.disk_cache.set(key, text, LLM_CACHE_TTL)
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key not in self._memory:
+                return None
+            self._memory.move_to_end(key)
+            return self._memory[key]
+
+    def _memory_put(self, key: str, text: str):
+        with self._lock:
+            self._memory[key] = text
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+
+_gateways: Dict[Optional[str], LLMGateway] = {}
+_gateways_lock = threading.Lock()
+
+
+def get_llm(api_key: Optional[str] = None) -> LLMGateway:
+    """
+    Returns the process-wide LLMGateway for an API key (defaults to GOOGLE_API_KEY).
+    """
+    api_key = api_key or os.getenv("GOOGLE_API_KEY")
+    with _gateways_lock:
+        if api_key not in _gateways:
+            _gateways[api_key] = LLMGateway(api_key)
+        return _gateways[api_key]
@@ -0,0 +1,169 @@
+import re
+from typing import Dict, List, Optional
+
+# "CS-GY 6083", "MATH-UA 123", "ECE-GY 9223A". Plain "CS 101" is not accepted: it collides with room numbers.
+COURSE_CODE_RE = re.compile(r'\b([A-Z]{2,5})\s*-\s*([A-Z]{2})\s*(\d{3,4}[A-Z]?)\b')
+# Anything that may be a course code, dashed or not ("CS 6923", "CS-GY6923"); only used to decide
+# which unclaimed text still goes to the LLM, so room numbers matching it just cost a fallback call
+LOOSE_CODE_RE = re.compile(r'\b[A-Z]{2,5}\s*-?\s*(?:[A-Z]{2}\s*)?\d{3,4}[A-Z]?\b')
+# Lines that mention other courses without being one
+REFERENCE_RE = re.compile(r'\b(?:pre-?req\w*|co-?req\w*|co-?requisite|equivalent|formerly|cross-?listed|same as|not open to)\b', re.IGNORECASE)
+INSTRUCTOR_RE = re.compile(r'^\s*(?:Instructor\(s\)|Instructors?|Professor|Prof\.?)\s*[:\-]\s*(.+)$', re.IGNORECASE)
+DAY = r'(?:Mon|Tue|Wed|Thu|Fri|Sat|Sun)[a-z]*'
+TIME_RE = re.compile(
+    r'(' + DAY + r'(?:\s*[,/&]?\s*' + DAY + r')*)\s+(\d{1,2}[.:]\d{2}\s*[AaPp][Mm])\s*-\s*(\d{1,2}[.:]\d{2}\s*[AaPp][Mm])'
+)
+AT_RE = re.compile(r'\bat\s+(.+?)(?:\s+with\s+|$)')
+WITH_RE = re.compile(r'\bwith\s+(.+)$')
+LOCATION_RE = re.compile(r'^\s*(?:Location|Room)\s*:\s*(.+)$', re.IGNORECASE)
+KEY_VALUE_RE = re.compile(r'^\s*[A-Za-z#][A-Za-z #/()]{0,30}:\s*')
+UNITS_RE = re.compile(r'^\s*[|\-–:]?\s*\d+(?:\.\d+)?\s*(?:-\s*\d+(?:\.\d+)?\s*)?units?\b', re.IGNORECASE)
+TITLE_SEPARATORS = " \t-–—|:"
+TITLE_WINDOW = 2
+PLACEHOLDER_NAMES = {"", "tbd", "tba", "staff", "to be announced"}
+
+
+def normalize_code(dept: str, school: str, number: str) -> str:
+    return f"{dept.upper()}-{school.upper()} {number.upper()}"
+
+
+def normalize_person(name: str) -> str:
+    """
+    Takes the first listed instructor and turns "Last, First" into "First Last".
+    Returns "TBD" for placeholders like "Staff".
+    """
+    name = re.split(r';|\band\b|/', name)[0].strip().strip(".")
+    if name.lower() in PLACEHOLDER_NAMES:
+        return "TBD"
+    if name.count(",") == 1:
+        last, first = [p.strip() for p in name.split(",")]
+        name = f"{first} {last}"
+    return " ".join(name.split())
+
+
+def _clean_title(text: str) -> str:
+    text = UNITS_RE.sub("", text).strip(TITLE_SEPARATORS)
+    # Drop trailing "| 3 units" style suffixes
+    text = re.split(r'\s+\|\s+', text)[0]
+    return text.strip(TITLE_SEPARATORS)
+
+
+def _looks_like_title(line: str) -> bool:
+    if KEY_VALUE_RE.match(line) or TIME_RE.search(line) or UNITS_RE.match(line):
+        return False
+    letters = sum(c.isalpha() for c in line)
+    return letters >= 3 and letters >= len(line) * 0.5
+
+
+class _Record:
+    __slots__ = ("code", "name", "professor", "time", "location", "lines", "unclaimed")
+
+    def __init__(self, code: str):
+        self.code = code
+        self.name: Optional[str] = None
+        self.professor: Optional[str] = None
+        self.time: Optional[str] = None
+        self.location: Optional[str] = None
+        self.lines: List[str] = []
+        # Lines no field claimed that may describe another course
+        self.unclaimed: List[str] = []
+
+    @property
+    def confident(self) -> bool:
+        return bool(self.name)
+
+    def to_dict(self) -> Dict[str, str]:
+        return {
+            "code": self.code,
+            "name": self.name or "",
+            "professor": self.professor or "TBD",
+            "time": self.time or "",
+            "location": self.location or "",
+            "parse_path": "local",
+        }
+
+
+class LocalParseResult:
+    def __init__(self, courses: List[Dict[str, str]], fallback_segments: List[str]):
+        self.courses = courses
+        # Raw text blocks the rule-based parser could not handle; send these to the LLM.
+        self.fallback_segments = fallback_segments
+
+
+def parse_course_text(text: str) -> LocalParseResult:
+    """
+    Rule-based extraction for Albert / catalog dumps.
+    Walks the text line by line; every course code starts a new record, and the
+    following lines fill in title, instructor, time and location.
+    """
+    records: List[_Record] = []
+    current: Optional[_Record] = None
+    leading: List[str] = []
+
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+
+        match = COURSE_CODE_RE.search(line)
+        # A code only opens a record at the start of a line ("Prerequisite: CS-GY 6033" must not)
+        if match and not line[:match.start()].strip(TITLE_SEPARATORS):
+            current = _Record(normalize_code(*match.groups()))
+            current.lines.append(raw_line)
+            records.append(current)
+            rest = _clean_title(line[match.end():])
+            if rest and _looks_like_title(rest):
+                current.name = rest
+            continue
+
+        if current is None:
+            # Page headers etc. before the first course; only keep lines that may be a course without a dashed code
+            if LOOSE_CODE_RE.search(line) and not REFERENCE_RE.search(line):
+                leading.append(raw_line)
+            continue
+        current.lines.append(raw_line)
+
+        instructor = INSTRUCTOR_RE.match(line)
+        if instructor:
+            current.professor = current.professor or normalize_person(instructor.group(1))
+            continue
+
+        time_match = TIME_RE.search(line)
+        if time_match:
+            current.time = current.time or " ".join(time_match.group(0).split())
+            at = AT_RE.search(line[time_match.end():])
+            if at and not current.location:
+                current.location = at.group(1).strip()
+            with_match = WITH_RE.search(line)
+            if with_match and not current.professor:
+                current.professor = normalize_person(with_match.group(1))
+            continue
+
+        location = LOCATION_RE.match(line)
+        if location:
+            current.location = current.location or location.group(1).strip()
+            continue
+
+        # Titles sit right under the code line; anything further down is description / noise
+        if not current.name and len(current.lines) <= TITLE_WINDOW + 1 and _looks_like_title(line):
+            current.name = _clean_title(line)
+        elif LOOSE_CODE_RE.search(line) and not REFERENCE_RE.search(line):
+            current.unclaimed.append(raw_line)
+
+    if not records:
+        stripped = text.strip()
+        return LocalParseResult([], [stripped] if stripped else [])
+
+    courses = []
+    fallback_segments = []
+    # Unclaimed text that may hold a course is never dropped; the LLM gets to look at it
+    if leading:
+        fallback_segments.append("\n".join(leading))
+    for record in records:
+        if record.confident:
+            courses.append(record.to_dict())
+            if record.unclaimed:
+                fallback_segments.append("\n".join(record.unclaimed))
+        else:
+            fallback_segments.append("\n".join(record.lines))
+    return LocalParseResult(courses, fallback_segments)
@@ -0,0 +1,75 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+import google.generativeai as genai
+
+# How long the list of available models is trusted before we ask the API again.
+MODEL_PROBE_TTL = int(os.getenv("MODEL_PROBE_TTL", str(6 * 3600)))
+
+_lock = threading.Lock()
+_configured_key: Optional[str] = None
+_models: Dict[str, genai.GenerativeModel] = {}
+_available: Dict[Optional[str], Any] = {}  # api_key -> (set of model names, checked_at)
+
+
+def configure(api_key: Optional[str] = None):
+    """
+    Calls genai.configure only when the key actually changes.
+    """
+    global _configured_key
+    api_key = api_key or os.getenv("GOOGLE_API_KEY")
+    with _lock:
+        if api_key != _configured_key:
+            genai.configure(api_key=api_key)
+            _configured_key = api_key
+            _models.clear()
+
+
+def get_model(model_name: str, generation_config: Optional[Dict[str, Any]] = None, system_instruction: Optional[str] = None) -> genai.GenerativeModel:
+    """
+    Returns a shared GenerativeModel handle for this (name, config, system instruction).
+    """
+    key = json.dumps([model_name, generation_config or {}, system_instruction], sort_keys=True)
+    with _lock:
+        if key not in _models:
+            _models[key] = genai.GenerativeModel(model_name, generation_config=generation_config, system_instruction=system_instruction)
+        return _models[key]
+
+
+def _short_name(name: str) -> str:
+    return name[len("models/"):] if name.startswith("models/") else name
+
+
+def available_models() -> Optional[Set[str]]:
+    """
+    Names of models that support generateContent for the configured key.
+    Probed with one list_models call and memoized for MODEL_PROBE_TTL. None if the probe failed.
+    """
+    with _lock:
+        cached = _available.get(_configured_key)
+        if cached and time.time() - cached[1] < MODEL_PROBE_TTL:
+            return cached[0]
+    try:
+        names = {_short_name(m.name) for m in genai.list_models() if 'generateContent' in m.supported_generation_methods}
+    except Exception as e:
+        print(f"Model probe failed: {e}")
+        return None
+    with _lock:
+        _available[_configured_key] = (names, time.time())
+    return names
+
+
+def resolve_model(candidates: List[str], api_key: Optional[str] = None) -> str:
+    """
+    Picks the first candidate that is available for the key.
+    Falls back to the first candidate if nothing matches or the probe fails.
+    """
+    configure(api_key)
+    names = available_models()
+    if names:
+        for candidate in candidates:
+            if _short_name(candidate) in names:
+                return candidate
+    return candidates[0]
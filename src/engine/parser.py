@@ -1,37 +1,47 @@
-import google.generativeai as genai
 import os
 import json
 from typing import List, Dict, Any
+from src.engine.llm import get_llm
+from src.engine.model_pool import resolve_model
+from src.engine.local_parser import parse_course_text
+from src.engine.chunker import parse_in_chunks, merge_courses
 
 class CourseParser:
     def __init__(self):
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-        
         # Try models in order of preference (Flash models are best for long context parsing)
-        models_to_try = ['gemini-2.0-flash-lite', 'gemini-flash-latest']
-        self.model = None
-        
-        for model_name in models_to_try:
-            try:
-                # Test initialization
-                test_model = genai.GenerativeModel(model_name)
-                self.model = test_model
-                print(f"✅ CourseParser initialized with {model_name}")
-                break
-            except Exception:
-                continue
-                
-        if not self.model:
-            print("⚠️ All models failed for Parser. Defaulting to gemini-2.0-flash-lite.")
-            self.model = genai.GenerativeModel('gemini-2.0-flash-lite')
+        self.model_name = resolve_model(['gemini-2.0-flash-lite', 'gemini-flash-latest'], os.getenv("GOOGLE_API_KEY"))
+        self.llm = get_llm()
+        print(f"✅ CourseParser initialized with {self.model_name}")
 
     def parse_raw_text(self, raw_text: str) -> List[Dict[str, str]]:
         """
         Parses unstructured text into a list of course dictionaries.
+        Well-formed segments are parsed locally; only the rest goes to the LLM.
+        Each course carries "parse_path": "local" or "llm".
         """
         if not raw_text or len(raw_text.strip()) < 10:
             return []
 
+        local = parse_course_text(raw_text)
+        courses = [
+            {
+                "course_id": c["code"],
+                "name": c["name"],
+                "instructor": "Staff" if c["professor"] == "TBD" else c["professor"],
+                "parse_path": "local",
+            }
+            for c in local.courses
+        ]
+        if not local.fallback_segments:
+            return courses
+
+        # Everything the local parser could not handle is split on course boundaries
+        # and parsed in small concurrent prompts instead of one truncated 50k prompt
+        fallback_text = "\n\n".join(local.fallback_segments)
+        llm_courses = parse_in_chunks(fallback_text, self._parse_chunk, code_key="course_id", professor_key="instructor")
+        return merge_courses([courses, llm_courses], code_key="course_id", professor_key="instructor")
+
+    def _parse_chunk(self, chunk_text: str) -> List[Dict[str, str]]:
         prompt = """
         You are a data extraction assistant. The following text is copied from a university course search system. It is messy and unstructured.
         
@@ -54,13 +64,8 @@ class CourseParser:
         Input Text:
         """
         
-        # Truncate to avoid token limits if necessary, though 1.5 Flash handles 1M tokens.
-        # Safe limit for now: 50,000 chars (~12k tokens)
-        truncated_text = raw_text[:50000]
-        
         try:
-            response = self.model.generate_content([prompt, truncated_text])
-            text = response.text.strip()
+            text = self.llm.generate(self.model_name, [prompt, chunk_text]).strip()
             
             # Clean up markdown if present
             if text.startswith("```json"):
@@ -70,7 +75,10 @@ class CourseParser:
             if text.endswith("```"):
                 text = text[:-3]
                 
-            return json.loads(text.strip())
+            llm_courses = [c for c in json.loads(text.strip()) if isinstance(c, dict)]
+            for c in llm_courses:
+                c["parse_path"] = "llm"
+            return llm_courses
         except Exception as e:
             print(f"Error parsing text: {e}")
             return []
@@ -0,0 +1,107 @@
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+# Below this, JudgeAgent falls back to the LLM.
+RMP_CONFIDENCE_THRESHOLD = float(os.getenv("RMP_CONFIDENCE_THRESHOLD", "0.65"))
+
+# How much each field contributes to the confidence score
+FIELD_WEIGHTS = {
+    "rmp_rating": 0.4,
+    "difficulty": 0.25,
+    "would_take_again_percent": 0.2,
+    "review_count": 0.15,
+}
+
+_NUM = r"(\d(?:\.\d{1,2})?)"
+# "Overall Quality Based on 45 ratings 4.2 / 5", "4.2/5 Overall Quality", "Quality: 4.2", "Rating: 4.2/5"
+QUALITY_RES = [
+    re.compile(r"overall\s+quality(?:\s+based\s+on\s+[\d,]+\s+ratings?)?\s*[:\-]?\s*" + _NUM + r"(?:\s*/\s*5)?", re.IGNORECASE),
+    re.compile(_NUM + r"\s*/\s*5\s+overall\s+quality", re.IGNORECASE),
+    re.compile(r"\b(?:quality|rating)\s*[:\-]\s*" + _NUM + r"(?:\s*/\s*5)?", re.IGNORECASE),
+]
+# "Level of Difficulty 3.1", "3.1 Level of Difficulty", "Difficulty: 3.1"
+DIFFICULTY_RES = [
+    re.compile(r"level\s+of\s+difficulty\s*[:\-]?\s*" + _NUM, re.IGNORECASE),
+    re.compile(_NUM + r"\s*(?:/\s*5\s*)?level\s+of\s+difficulty", re.IGNORECASE),
+    re.compile(r"\bdifficulty\s*[:\-]\s*" + _NUM, re.IGNORECASE),
+]
+# "85% Would take again", "Would take again: 85%"
+TAKE_AGAIN_RES = [
+    re.compile(r"(\d{1,3}(?:\.\d+)?)\s*%\s*would\s+take\s+again", re.IGNORECASE),
+    re.compile(r"would\s+take\s+again\s*[:\-]?\s*(\d{1,3}(?:\.\d+)?)\s*%", re.IGNORECASE),
+]
+# "Based on 45 ratings", "45 ratings", "45 Student Ratings"
+COUNT_RES = [
+    re.compile(r"based\s+on\s+([\d,]+)\s+ratings?", re.IGNORECASE),
+    re.compile(r"\b([\d,]+)\s+(?:student\s+)?ratings?\b", re.IGNORECASE),
+]
+TAGS_RE = re.compile(r"top\s+tags\s*[:\-]?\s*(.+?)(?:\n|$)", re.IGNORECASE)
+
+
+def _find_all(patterns: List[re.Pattern], text: str, low: float, high: float) -> List[float]:
+    values = []
+    for pattern in patterns:
+        for match in pattern.finditer(text):
+            try:
+                value = float(match.group(1).replace(",", ""))
+            except ValueError:
+                continue
+            if low <= value <= high:
+                values.append(value)
+        if values:
+            # Earlier patterns are the more specific layouts; don't mix in looser matches
+            break
+    return values
+
+
+def _summary(data: Dict[str, Any], tags: Optional[str]) -> str:
+    parts = []
+    if data["rmp_rating"] is not None:
+        parts.append(f"Rated {data['rmp_rating']}/5")
+    if data["difficulty"] is not None:
+        parts.append(f"difficulty {data['difficulty']}/5")
+    if data["would_take_again_percent"] is not None:
+        parts.append(f"{data['would_take_again_percent']:g}% would take again")
+    summary = ", ".join(parts)
+    if data["review_count"]:
+        summary += f" across {data['review_count']} ratings"
+    summary = summary + "." if summary else "No data found."
+    if tags:
+        summary += f" Top tags: {tags}."
+    return summary
+
+
+def extract_rmp_stats(text: str) -> Dict[str, Any]:
+    """
+    Reads RMP statistics straight from a Rate My Professors snippet.
+    Returns the JudgeAgent.extract_rmp_data() schema plus a "confidence" score in [0, 1]:
+    the share of fields found, lowered when the text holds conflicting values
+    (e.g. a search page listing several professors).
+    """
+    text = text or ""
+    ratings = _find_all(QUALITY_RES, text, 0.0, 5.0)
+    difficulties = _find_all(DIFFICULTY_RES, text, 0.0, 5.0)
+    take_again = _find_all(TAKE_AGAIN_RES, text, 0.0, 100.0)
+    counts = _find_all(COUNT_RES, text, 1, 100000)
+
+    data = {
+        "rmp_rating": ratings[0] if ratings else None,
+        "difficulty": difficulties[0] if difficulties else None,
+        "would_take_again_percent": take_again[0] if take_again else None,
+        "summary": "",
+        "has_data": bool(ratings),
+        "review_count": int(counts[0]) if counts else 0,
+    }
+
+    confidence = sum(weight for field, weight in FIELD_WEIGHTS.items() if data[field])
+    if data["rmp_rating"] == 0.0:
+        # "0.0/5" is what RMP shows for professors without ratings
+        data["has_data"] = False
+    conflicting = sum(1 for values in (ratings, difficulties, take_again) if len(set(values)) > 1)
+    confidence = max(0.0, confidence - 0.3 * conflicting)
+
+    tags = TAGS_RE.search(text)
+    data["summary"] = _summary(data, tags.group(1).strip().rstrip(".") if tags else None)
+    data["confidence"] = round(confidence, 2)
+    return data
@@ -1,30 +1,164 @@
-import google.generativeai as genai
-from PIL import Image
+from PIL import Image, ImageChops, ImageOps
 import os
 import json
-from typing import List, Dict, Any
+from typing import Callable, List, Dict, Any, Optional, Tuple
+from src.engine.chunker import merge_courses
+from src.engine.concurrency import run_concurrently
+from src.engine.llm import get_llm
+from src.engine.model_pool import resolve_model
+
+# Longest side sent to the model; Albert text stays legible well below full-screen resolution
+VISION_MAX_SIDE = int(os.getenv("VISION_MAX_SIDE", "1600"))
+VISION_MAX_WORKERS = int(os.getenv("VISION_MAX_WORKERS", "4"))
+# Pixels differing from the background by more than this are content
+CONTENT_THRESHOLD = 24
+CROP_MARGIN = 8
+# Page hash (see page_hash): text is cut into rows and cells, and each cell gets a dHash over
+# HASH_BLOCK-pixel blocks in HASH_BANDS horizontal bands
+HASH_BLOCK = 4
+HASH_BANDS = 2
+# Gray-level step a dHash bit needs, so flat areas don't flip bits on compression noise
+HASH_STEP = 8
+# Only dark ink delimits rows and cells; JPEG ringing around glyphs stays below this
+HASH_INK_THRESHOLD = 128
+# Blank pixels that separate cells in a row (column gaps), and the smallest cell kept (drops a stray cursor)
+HASH_CELL_GAP = 12
+HASH_MIN_CELL = 12
+# Two cells match if at most HASH_DISTANCE bits plus HASH_DISTANCE_RATIO of their bits differ
+HASH_DISTANCE = int(os.getenv("VISION_HASH_DISTANCE", "5"))
+HASH_DISTANCE_RATIO = 0.05
+
+
+def content_mask(gray: Image.Image, threshold: int = CONTENT_THRESHOLD) -> Image.Image:
+    """
+    255 where a grayscale image differs from its background (taken from the corners) by more than threshold.
+    """
+    width, height = gray.size
+    corners = sorted(gray.getpixel(p) for p in ((0, 0), (width - 1, 0), (0, height - 1), (width - 1, height - 1)))
+    background = Image.new("L", gray.size, (corners[1] + corners[2]) // 2)
+    return ImageChops.difference(gray, background).point(lambda p: 255 if p > threshold else 0)
+
+
+def crop_to_content(image: Image.Image) -> Image.Image:
+    """
+    Trims the uniform border (window background, empty page margins) around the content.
+    The background colour is taken from the corners.
+    """
+    gray = image if image.mode == "L" else image.convert("L")
+    width, height = gray.size
+    box = content_mask(gray).getbbox()
+    if not box:
+        return image
+    left, top, right, bottom = box
+    return image.crop((max(0, left - CROP_MARGIN), max(0, top - CROP_MARGIN), min(width, right + CROP_MARGIN), min(height, bottom + CROP_MARGIN)))
+
+
+def preprocess_image(image: Image.Image, max_side: int = VISION_MAX_SIDE, grayscale: bool = True) -> Image.Image:
+    """
+    Crop to content, grayscale and downscale so the longest side is at most max_side.
+    """
+    image = ImageOps.exif_transpose(image)
+    if grayscale:
+        image = image.convert("L")
+    elif image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    image = crop_to_content(image)
+    if max(image.size) > max_side:
+        image = image.copy()
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+    return image
+
+
+def _runs(profile: List[int], max_gap: int) -> List[Tuple[int, int]]:
+    """
+    [start, end) spans of the non-zero entries of profile, bridging gaps of up to max_gap zeros.
+    """
+    spans: List[Tuple[int, int]] = []
+    start = last = None
+    for i, value in enumerate(profile):
+        if not value:
+            continue
+        if start is None:
+            start = i
+        elif i - last > max_gap + 1:
+            spans.append((start, last + 1))
+            start = i
+        last = i
+    if start is not None:
+        spans.append((start, last + 1))
+    return spans
+
+
+def page_hash(image: Image.Image) -> List[List[Tuple[int, ...]]]:
+    """
+    Perceptual hash of a preprocessed page: for each text row, top to bottom, the dHash of each of its
+    cells (code, title, instructor ...). Cells are hashed over fixed-size pixel blocks from their own
+    left edge, so a re-capture (scroll offset, cursor in the margin, JPEG noise) keeps nearly the same
+    bits, while another course title or instructor in any row changes many of them.
+    A cell hash is (width in blocks, one bit row per band).
+    """
+    gray = image if image.mode == "L" else image.convert("L")
+    ink = content_mask(gray, HASH_INK_THRESHOLD)
+    width, height = gray.size
+
+    rows = []
+    for top, bottom in _runs(list(ink.resize((1, height), Image.BOX).tobytes()), 2):
+        if bottom - top < HASH_BANDS * 2:
+            continue
+        line = ink.crop((0, top, width, bottom))
+        cells = []
+        for left, right in _runs(list(line.resize((width, 1), Image.BOX).tobytes()), HASH_CELL_GAP):
+            if right - left < HASH_MIN_CELL:
+                continue
+            blocks = -(-(right - left) // HASH_BLOCK)
+            pixels = gray.crop((left, top, left + blocks * HASH_BLOCK, bottom)).resize((blocks, HASH_BANDS), Image.BOX).tobytes()
+            bands = []
+            for band in range(HASH_BANDS):
+                values = pixels[band * blocks:(band + 1) * blocks]
+                bits = 0
+                for a, b in zip(values, values[1:]):
+                    bits = (bits << 1) | (a - b > HASH_STEP)
+                bands.append(bits)
+            cells.append((blocks, *bands))
+        if cells:
+            rows.append(cells)
+    return rows
+
+
+def _cell_distance(a: Tuple[int, ...], b: Tuple[int, ...]) -> int:
+    """
+    Differing bits of two cell hashes; the longer one is cut to the shorter's width, each dropped block counts as a difference.
+    """
+    (width_a, *bands_a), (width_b, *bands_b) = a, b
+    shift_a, shift_b = max(0, width_a - width_b), max(0, width_b - width_a)
+    distance = (shift_a + shift_b) * len(bands_a)
+    for x, y in zip(bands_a, bands_b):
+        distance += bin((x >> shift_a) ^ (y >> shift_b)).count("1")
+    return distance
+
+
+def same_page(a: List[List[Tuple[int, ...]]], b: List[List[Tuple[int, ...]]]) -> bool:
+    """
+    True if two page hashes have the same rows and cells, each cell within the HASH_DISTANCE tolerance.
+    """
+    if len(a) != len(b):
+        return False
+    for row_a, row_b in zip(a, b):
+        if len(row_a) != len(row_b):
+            return False
+        for cell_a, cell_b in zip(row_a, row_b):
+            bits = max(cell_a[0], cell_b[0]) * HASH_BANDS
+            if _cell_distance(cell_a, cell_b) > HASH_DISTANCE + HASH_DISTANCE_RATIO * bits:
+                return False
+    return True
+
 
 class CourseVision:
     def __init__(self):
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-        
         # Try models in order of preference (Flash models are best for vision)
-        models_to_try = ['gemini-1.5-flash', 'gemini-2.0-flash-lite']
-        self.model = None
-        
-        for model_name in models_to_try:
-            try:
-                # Test initialization
-                test_model = genai.GenerativeModel(model_name)
-                self.model = test_model
-                print(f"✅ CourseVision initialized with {model_name}")
-                break
-            except Exception:
-                continue
-                
-        if not self.model:
-            print("⚠️ All models failed for Vision. Defaulting to gemini-2.0-flash-lite.")
-            self.model = genai.GenerativeModel('gemini-2.0-flash-lite')
+        self.model_name = resolve_model(['gemini-1.5-flash', 'gemini-2.0-flash-lite'], os.getenv("GOOGLE_API_KEY"))
+        self.llm = get_llm()
+        print(f"✅ CourseVision initialized with {self.model_name}")
 
     def extract_course_info(self, image: Image.Image) -> List[Dict[str, str]]:
         """
@@ -34,12 +168,12 @@ class CourseVision:
         prompt = """
         Analyze this screenshot of a course selection system (like NYU Albert).
         Extract all visible courses.
-        
+
         For each course, identify:
         1. Course Code (e.g., CS-GY 6083)
         2. Course Name (e.g., Principles of Database Systems)
         3. Instructor Name (e.g., Ying Lu)
-        
+
         Output strictly in JSON format as a list of objects:
         [
             {"course_id": "...", "name": "...", "instructor": "..."},
@@ -48,18 +182,66 @@ class CourseVision:
         If no courses are found, return [].
         Do not include markdown formatting like ```json. Just the raw JSON string.
         """
-        
+
         try:
-            response = self.model.generate_content([prompt, image])
-            text = response.text.strip()
-            
+            text = self.llm.generate(self.model_name, [prompt, image]).strip()
+
             # Clean up markdown if present
             if text.startswith("```json"):
                 text = text[7:]
             if text.endswith("```"):
                 text = text[:-3]
-                
+
             return json.loads(text.strip())
         except Exception as e:
             print(f"Error extracting course info: {e}")
             return []
+
+    def prepare_pages(self, images: List[Image.Image], max_workers: int = VISION_MAX_WORKERS) -> List[Image.Image]:
+        """
+        Preprocesses screenshots on worker threads and drops re-captures of an earlier page
+        (every text row and cell matches, see page_hash). Page order is preserved.
+        """
+        prepared: Dict[int, Tuple[Image.Image, List[List[Tuple[int, ...]]]]] = {}
+
+        def _prepare(image, status):
+            page = preprocess_image(image)
+            return page, page_hash(page)
+
+        for event, idx, payload in run_concurrently(images, _prepare, max_workers=max_workers):
+            if event == "done":
+                prepared[idx] = payload
+            elif event == "error":
+                print(f"Skipping unreadable screenshot {idx + 1}: {payload}")
+
+        pages: List[Image.Image] = []
+        seen: List[List[List[Tuple[int, ...]]]] = []
+        for idx in sorted(prepared):
+            page, digest = prepared[idx]
+            if any(same_page(digest, other) for other in seen):
+                continue
+            pages.append(page)
+            seen.append(digest)
+        return pages
+
+    def extract_batch(self, images: List[Image.Image], on_page: Optional[Callable[[List[Dict[str, Any]], int, int], None]] = None,
+                      max_workers: int = VISION_MAX_WORKERS) -> List[Dict[str, Any]]:
+        """
+        Extracts courses from several screenshots: preprocess + dedup, then all pages are sent
+        concurrently and the course lists merged (deduplicated by code and instructor).
+        on_page(merged_so_far, pages_done, pages_total) is called from the caller's thread.
+        """
+        pages = self.prepare_pages(images, max_workers=max_workers)
+        results: List[List[Dict[str, Any]]] = []
+        done = 0
+        for event, idx, payload in run_concurrently(pages, lambda page, status: self.extract_course_info(page), max_workers=max_workers):
+            if event == "status":
+                continue
+            done += 1
+            if event == "done" and isinstance(payload, list):
+                results.append(payload)
+            elif event == "error":
+                print(f"Page {idx + 1} failed: {payload}")
+            if on_page:
+                on_page(merge_courses(results, code_key="course_id", professor_key="instructor"), done, len(pages))
+        return merge_courses(results, code_key="course_id", professor_key="instructor")
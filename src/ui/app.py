@@ -1,6 +1,4 @@
 import streamlit as st
-import google.generativeai as genai
-from tavily import TavilyClient
 import json
 import pandas as pd
 import os
@@ -14,6 +12,22 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.
 # Load Env
 load_dotenv()
 
+from src.data.search import get_search_client
+from src.data.catalog import PARSED_FIELDS, CourseCatalog
+from src.data.name_resolver import get_name_resolver
+from src.data.analysis_store import AnalysisResultStore
+from src.engine.digest import DIGEST_KEYS, get_digester, goal_name, goals_to_render, merge_view
+from src.data.requirements import FETCH_FAILED, get_requirements_store, prewarm_popular_programs
+from src.data.professor_index import get_professor_index, profile_to_rmp_data
+from src.engine.llm import get_llm
+from src.engine.json_stream import IncrementalJSONParser
+from src.engine.context import CONTEXT_BUDGETS, select_evidence
+from src.engine.model_pool import resolve_model
+from src.engine.local_parser import parse_course_text
+from src.engine.chunker import parse_in_chunks, merge_courses
+from src.engine.vision import CourseVision
+from PIL import Image
+
 # --- Page Config & Custom CSS (Premium Glassmorphism) ---
 st.set_page_config(page_title="Course Pilot v3.1", page_icon="✈️", layout="wide")
 
@@ -89,6 +103,10 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Popular programs' degree requirements are fetched once per process, off the request path
+if os.getenv("TAVILY_API_KEY"):
+    prewarm_popular_programs(os.getenv("TAVILY_API_KEY"), os.getenv("GOOGLE_API_KEY"))
+
 # --- Session State Initialization ---
 if 'profile_confirmed' not in st.session_state:
     st.session_state['profile_confirmed'] = False
@@ -101,9 +119,24 @@ def clean_professor_name(name):
     if "," in name:
         parts = name.split(",")
         if len(parts) == 2:
-            return f"{parts[1].strip()} {parts[0].strip()}"
+            name = f"{parts[1].strip()} {parts[0].strip()}"
+    # Reordered names and accepted corrections snap to a known instructor locally, before any search
+    if name not in ("TBD", "Staff"):
+        match = get_name_resolver().resolve(name)
+        if match and match.method != "fuzzy":
+            return match.name
     return name
 
+def suggest_professor_name(name):
+    """
+    Known instructor that name is probably a typo of, or None.
+    Only a suggestion: nothing is changed or remembered until the user accepts it.
+    """
+    if name in ("TBD", "Staff"):
+        return None
+    match = get_name_resolver().resolve(name)
+    return match.name if match and match.method == "fuzzy" else None
+
 def extract_json_from_text(text):
     try: return json.loads(text)
     except: pass
@@ -113,210 +146,221 @@ def extract_json_from_text(text):
         except: pass
     return []
 
-def get_generative_model(api_key):
-    genai.configure(api_key=api_key)
+def get_session_catalog():
+    """
+    Index over this session's parsed courses; rebuilt only when the course list is replaced.
+    """
+    courses = st.session_state['courses']
+    cached = st.session_state.get('course_catalog')
+    if cached is None or cached[0] is not courses:
+        cached = (courses, CourseCatalog.from_dicts(courses, PARSED_FIELDS))
+        st.session_state['course_catalog'] = cached
+    return cached[1]
+
+def get_analysis_store():
+    """
+    This session's analysis results, backed by the store shared across sessions.
+    """
+    if 'analysis_results' not in st.session_state:
+        st.session_state['analysis_results'] = {}
+    return AnalysisResultStore(st.session_state['analysis_results'])
+
+def get_generative_model_name(api_key):
     # User suggested gemini-flash-latest as the safest option
     # We try 'gemini-flash-latest' first, then 'gemini-2.0-flash-lite', then 'gemini-1.5-flash'
+    # Availability is probed once per process and memoized (see src/engine/model_pool.py)
     models_to_try = ['gemini-flash-latest', 'gemini-2.0-flash-lite', 'gemini-1.5-flash']
+    return resolve_model(models_to_try, api_key)
+
+def generate_text(api_key, prompt, cache=True):
+    # All general-purpose calls go through the cached LLM gateway
+    return get_llm(api_key).generate(get_generative_model_name(api_key), prompt, cache=cache)
+
+def parse_segment_with_gemini(text, api_key):
+    prompt = """
+    You are a strict data extraction assistant.
+    Extract course info from this text.
     
-    for model_name in models_to_try:
-        try:
-            # print(f"Trying model: {model_name}")
-            m = genai.GenerativeModel(model_name)
-            return m
-        except: continue
-            
-    return genai.GenerativeModel('gemini-flash-latest')
+    Output JSON list: [{"code": "...", "name": "...", "professor": "..."}]
+    
+    Rules:
+    1. **Professor Name**: Look for "Instructor:", "Prof.", or names after the course title. 
+       - IGNORE locations (e.g. "Jacobs Building", "Room 101").
+       - IGNORE times (e.g. "Mon 2:00PM").
+       - If not found, use "TBD".
+    2. **Course Code**: Standardize to full format (e.g. "CS-GY 6033").
+    3. **Course Name**: Full title.
+    4. **Auto-correct**: Fix obvious typos in names (e.g. "Linda Selie" -> "Linda Sellie").
+    
+    Text:
+    """ + text
+    courses = [c for c in extract_json_from_text(generate_text(api_key, prompt)) if isinstance(c, dict)]
+    for c in courses:
+        c['parse_path'] = "llm"
+    return courses
+
+def parse_raw_text_with_gemini(text, api_key, on_chunk=None):
+    # Fast path: well-formed Albert/catalog dumps are parsed locally, no LLM round-trip
+    local = parse_course_text(text)
+    courses = local.courses
+    if not local.fallback_segments:
+        return courses
 
-def parse_raw_text_with_gemini(text, api_key):
     if not api_key:
-        st.error("❌ Missing Google API Key")
-        return []
+        if not courses:
+            st.error("❌ Missing Google API Key")
+        return courses
     try:
-        model = get_generative_model(api_key)
-        # st.toast(f"Using Model: {model.model_name}", icon="🤖")
-        
-        prompt = """
-        You are a strict data extraction assistant.
-        Extract course info from this text.
-        
-        Output JSON list: [{"code": "...", "name": "...", "professor": "..."}]
-        
-        Rules:
-        1. **Professor Name**: Look for "Instructor:", "Prof.", or names after the course title. 
-           - IGNORE locations (e.g. "Jacobs Building", "Room 101").
-           - IGNORE times (e.g. "Mon 2:00PM").
-           - If not found, use "TBD".
-        2. **Course Code**: Standardize to full format (e.g. "CS-GY 6033").
-        3. **Course Name**: Full title.
-        4. **Auto-correct**: Fix obvious typos in names (e.g. "Linda Selie" -> "Linda Sellie").
-        
-        Text:
-        """ + text[:50000] # Reduced limit to be safe
-        
-        response = model.generate_content(prompt)
-        return extract_json_from_text(response.text)
+        # Only the segments the local parser could not handle, split into small prompts
+        # that run concurrently (no more 50k truncation)
+        fallback_text = "\n\n".join(local.fallback_segments)
+        progress = None
+        if on_chunk:
+            progress = lambda llm_courses, done, total: on_chunk(merge_courses([courses, llm_courses]), done, total)
+        llm_courses = parse_in_chunks(fallback_text, lambda chunk: parse_segment_with_gemini(chunk, api_key), on_chunk=progress)
+        return merge_courses([courses, llm_courses])
     except Exception as e:
         st.error(f"Parse Error ({type(e).__name__}): {e}")
-        return []
+        return courses
+
+def extract_courses_from_screenshots(files, on_page=None):
+    """
+    Runs CourseVision over uploaded screenshots (preprocessed, deduplicated, pages in parallel).
+    Returns courses in the same shape as parse_raw_text_with_gemini().
+    """
+    def _to_app(courses):
+        return [{
+            "code": c.get("course_id", ""),
+            "name": c.get("name", ""),
+            "professor": c.get("instructor") or "TBD",
+            "parse_path": "vision",
+        } for c in courses]
+
+    # Image.open() is lazy; read the uploads here rather than on the worker threads
+    images = []
+    for f in files:
+        image = Image.open(f)
+        image.load()
+        images.append(image)
+    progress = (lambda courses, done, total: on_page(_to_app(courses), done, total, "pages")) if on_page else None
+    return _to_app(CourseVision().extract_batch(images, on_page=progress))
 
 def fetch_degree_requirements(school, major, api_key):
-    try:
-        tavily = TavilyClient(api_key=api_key)
-        query = f"{school} {major} degree requirements core courses electives pdf"
-        result = tavily.search(query=query, search_depth="advanced", max_results=3)
-        return "\n".join([f"- {r['content']} (Source: {r['url']})" for r in result['results']])
-    except:
-        return "Could not fetch requirements."
-
-from src.engine.judge import JudgeAgent
-
-def analyze_course_with_tavily(course_info, user_query, user_profile, req_context, tavily_api_key, google_api_key, status_container=None):
-    try:
-        tavily = TavilyClient(api_key=tavily_api_key)
-        prof_name = clean_professor_name(course_info['professor'])
-        
-        # --- 1. Data Gathering (Agent A) ---
+    # Shared across sessions per (school, major); only a never-seen program waits on a search
+    return get_requirements_store().requirements_text(school, major, api_key, os.getenv("GOOGLE_API_KEY"))
+
+from src.engine.judge import get_judge
+from src.engine.concurrency import run_concurrently, limiter_stats
+
+def gather_course_evidence(course_info, prof_name, user_profile, tavily_api_key, google_api_key, status_container=None):
+    """
+    Searches RMP / Reddit and verifies the RMP stats. Returns (verified_data, context).
+    """
+    tavily = get_search_client(tavily_api_key)
+
+    # Precomputed professor profile (build_professor_index.py): skips the RMP search and the Judge.
+    # Entries recorded without any RMP data still fall back to a live search.
+    profile = get_professor_index().get(prof_name) if prof_name != "TBD" else None
+    profile = profile if profile and profile.has_data else None
+
+    # --- 1. Data Gathering (Agent A) ---
+    if profile:
+        if status_container: status_container.write(f"📇 Using indexed RMP profile for **{profile.display_name}**, searching Reddit...")
+    else:
         if status_container: status_container.write(f"🌐 Searching RMP & Reddit for **{prof_name}**...")
-        results = []
-        
-        # RMP Search
-        if prof_name != "TBD":
-            rmp_query = f"{prof_name} {user_profile.get('school', '')} Rate My Professors"
-            rmp_result = tavily.search(query=rmp_query, search_depth="advanced", max_results=2)
-            results.extend(rmp_result['results'])
-        
-        # Review Search
-        if prof_name == "TBD":
-            review_query = f"{course_info['code']} {user_profile.get('school', '')} difficulty workload review reddit 1point3acres"
-        else:
-            review_query = f"{course_info['code']} {prof_name} {user_profile.get('school', '')} rating review difficulty workload reddit 1point3acres"
-            
-        review_result = tavily.search(query=review_query, search_depth="advanced", max_results=4)
-        results.extend(review_result['results'])
-        
-        # Deduplicate
-        seen_urls = set()
-        unique_results = []
-        for r in results:
-            if r['url'] not in seen_urls:
-                unique_results.append(r)
-                seen_urls.add(r['url'])
-        
-        # --- 2. The Judge (Agent B) ---
-        # Filter content for the Judge (focus on RMP-like content)
-        rmp_content = "\n".join([r['content'] for r in unique_results if "Rate My Professors" in r.get('title', '') or "ratemyprofessors" in r.get('url', '')])
-        
+    results = []
+
+    # RMP Search
+    if prof_name != "TBD" and not profile:
+        rmp_query = f"{prof_name} {user_profile.get('school', '')} Rate My Professors"
+        rmp_result = tavily.search(query=rmp_query, search_depth="advanced", max_results=2, source="rmp")
+        results.extend(rmp_result['results'])
+
+    # Review Search
+    if prof_name == "TBD":
+        review_query = f"{course_info['code']} {user_profile.get('school', '')} difficulty workload review reddit 1point3acres"
+    else:
+        review_query = f"{course_info['code']} {prof_name} {user_profile.get('school', '')} rating review difficulty workload reddit 1point3acres"
+
+    review_result = tavily.search(query=review_query, search_depth="advanced", max_results=4, source="reddit")
+    results.extend(review_result['results'])
+
+    # Deduplicate
+    seen_urls = set()
+    unique_results = []
+    for r in results:
+        if r['url'] not in seen_urls:
+            unique_results.append(r)
+            seen_urls.add(r['url'])
+
+    # --- 2. The Judge (Agent B) ---
+    # Filter content for the Judge (focus on RMP-like content)
+    rmp_content = "\n".join([r['content'] for r in unique_results if "Rate My Professors" in r.get('title', '') or "ratemyprofessors" in r.get('url', '')])
+
+    if profile:
+        verified_data = profile_to_rmp_data(profile)
+    else:
         if status_container: status_container.write("⚖️ Judge Agent verifying data...")
-        judge = JudgeAgent(google_api_key)
-        verified_data = judge.extract_rmp_data(rmp_content)
-        
-        # --- 3. Final Analysis (Tiered Fallback) ---
-        if status_container: status_container.write(f"🧠 Generating advice for **{user_profile.get('goal')}**...")
-        context = "\n".join([f"- Content: {r['content']}\n  Source: {r['url']}" for r in unique_results])
-        
-        # --- System Instruction (Strategic Advisor Persona) ---
-        system_instruction = """
-        # ROLE
-        You are a sharp, pragmatic, and critically-minded academic advising agent for NYU Tandon students.
-        Your job is NOT to praise courses; your job is to help students make informed trade-offs and optimize outcomes.
-
-        # CORE MISSION
-        You must help students navigate:
-        1. course content alignment
-        2. workload and GPA risks
-        3. internship/job-seeking constraints
-        4. opportunity cost (e.g., LeetCode vs side projects vs coursework)
-        5. credit and graduation planning
-
-        # CORE PRINCIPLES
-        1. **No Generic Advice**: Reject "study hard". Give specific strategy.
-        2. **Evidence-Based**: All claims must be backed by data (RMP, Reddit).
-        3. **Contradiction Audit**: Surface contradictions (e.g. Rating < 3.0 but "Easy A").
-        4. **Opportunity Cost**: Explicitly model trade-offs (Job Search vs Coursework).
-        5. **Transparency**: Reveal sources.
-        6. **No Hallucination**: If data is sparse, say "Data Sparse".
-
-        # DECISION STYLE
-        Do NOT output "good course" / "bad course".
-        Output must reflect: "good for whom + under what conditions + why".
-        """
+        judge = get_judge(google_api_key)
+        verified_data = judge.extract_rmp_data(rmp_content, professor=prof_name, course_code=course_info['code'])
+
+    # Most relevant, non-duplicate passages only, within the prompt's token budget
+    evidence = select_evidence(
+        [(r['content'], r['url']) for r in unique_results],
+        course_code=course_info['code'],
+        professor=None if prof_name == "TBD" else prof_name,
+        budget_tokens=CONTEXT_BUDGETS["analysis"]
+    )
+    context = "\n".join([f"- Content: {s.text}\n  Source: {s.source}" for s in evidence])
+    if profile and profile.summary:
+        context = f"- Content: RMP summary for {profile.display_name}: {profile.summary}\n  Source: Rate My Professors (indexed)\n" + context
+    return verified_data, context
+
+def analyze_course_with_tavily(course_info, user_query, user_profile, req_context, tavily_api_key, google_api_key, status_container=None, on_section=None, on_view=None):
+    """
+    Returns the analysis JSON string for the profile's goal. If on_section is given, the answer is streamed and
+    on_section(key, value) is called for each top-level JSON key as soon as it is complete.
+    Two stages: a goal-independent evidence digest (cached per course / professor), then goal-specific advice
+    rendered from the digest. When other goals are rendered in the same call, on_view(goal, result_json)
+    receives their analysis JSON.
+    """
+    try:
+        prof_name = clean_professor_name(course_info['professor'])
+        school = user_profile.get('school', '')
+        digester = get_digester(google_api_key)
 
-        # Configure model with System Instruction
-        model = genai.GenerativeModel(
-            'gemini-2.0-flash-lite', 
-            generation_config={"response_mime_type": "application/json"},
-            system_instruction=system_instruction
-        )
-        
-        # --- Goal-Driven Logic ---
-        user_goal = user_profile.get('goal', 'General')
-        
-        summary_prompt = f"""
-        # User Context
-        - Mission Goal: {user_goal}
-        - Course: {course_info['code']} - {prof_name}
-        - RMP Data: Rating {verified_data['rmp_rating']}, Difficulty {verified_data['difficulty']}
-        - Reviews: {context}
-        - Requirements: {req_context}
-
-        # Task
-        Perform a strategic analysis based on the user's goal.
-        
-        1. **Classify Persona**: Based on Mission Goal ({user_goal}), classify user as:
-           - "Job Seeking" (prioritize interview prep, resume)
-           - "Research Oriented" (prioritize theory, lab)
-           - "GPA Farming" (minimize workload)
-           - "Undecided" (exploratory)
-        
-        2. **Deep Dive**: Extract specific details (Workload hours, Exam type, Languages).
-        
-        3. **Contradiction Audit**: Check if Rating matches Reviews.
-        
-        4. **Opportunity Cost**: Analyze trade-offs. Does this course kill interview prep time?
-        
-        5. **Strategic Planning**: Where does this fit in a 4-semester plan?
-        
-        Output JSON Schema:
-        {{
-            "data_source": "RMP Verified" | "Reddit Consensus" | "AI Estimate",
-            "persona_classification": "Job Seeking" | "Research Oriented" | "GPA Farming" | "Undecided",
-            "deep_dive": {{
-                "workload": "string (Hours/week, intensity)",
-                "grading": "string (Curve, strictness, distribution)",
-                "teaching": "string (Style, clarity, engagement)",
-                "exams": "string (Format, difficulty, open/closed book)",
-                "projects": "string (Individual/Group, Languages, Resume value)",
-                "industry_relevance": "string (Skills, Real-world alignment)"
-            }},
-            "contradiction_audit": {{
-                "flag": boolean,
-                "details": "string (Explain any mismatch found)"
-            }},
-            "suitability": {{
-                "best_for": ["string", "string"],
-                "not_for": ["string", "string"],
-                "risk_factors": ["string", "string"]
-            }},
-            "strategic_planning": {{
-                "roadmap_context": "string (e.g. 'Take in Sem 2 after Python')",
-                "credit_advice": "string (e.g. 'Pair with a light elective')",
-                "alternatives": ["string (Similar courses)"]
-            }},
-            "opportunity_cost": {{
-                "trade_offs": "string (e.g. 'High workload reduces LeetCode time')",
-                "warning": "string (Critical warning if applicable)"
-            }}
-        }}
-        """
-        response = model.generate_content(summary_prompt)
-        return response.text
+        # --- Stage 1: Evidence digest (shared by every goal) ---
+        digest = digester.get(course_info['code'], prof_name, school)
+        if digest:
+            if status_container: status_container.write(f"♻️ Reusing evidence digest for **{prof_name}**...")
+        else:
+            verified_data, context = gather_course_evidence(course_info, prof_name, user_profile, tavily_api_key, google_api_key, status_container)
+            if status_container: status_container.write("🧾 Condensing evidence...")
+            digest = digester.digest(course_info['code'], prof_name, school, verified_data, context, on_section=on_section)
+        if on_section:
+            for key in DIGEST_KEYS:
+                on_section(key, digest.get(key))
+
+        # --- Stage 2: Goal-specific advice from the digest only ---
+        goal = goal_name(user_profile.get('goal'))
+        goals = goals_to_render(goal)
+        if status_container: status_container.write(f"🧠 Generating advice for **{goal}**...")
+
+        def _on_view(view_goal, view):
+            if on_view and view_goal != goal:
+                on_view(view_goal, json.dumps(merge_view(digest, view), ensure_ascii=False))
+
+        views = digester.render_views(digest, course_info['code'], prof_name, goals, req_context,
+                                      on_view=_on_view if on_view else None, on_section=on_section)
+        return json.dumps(merge_view(digest, views[goal]), ensure_ascii=False)
     except Exception as e:
         return json.dumps({"error": str(e)})
 
-def generate_schedule_recommendations(courses, user_profile, req_context, api_key):
+def stream_schedule_recommendations(courses, user_profile, req_context, api_key):
+    """
+    Yields the recommendation text in chunks as it is generated.
+    """
     try:
-        model = get_generative_model(api_key)
         course_list_str = "\n".join([f"- {c['code']} {c['name']} ({c['professor']})" for c in courses])
         prompt = f"""
         Role: "CourseMate" (Strategic Advisor).
@@ -331,10 +375,129 @@ def generate_schedule_recommendations(courses, user_profile, req_context, api_ke
         3. **Gap Analysis**: What's missing?
         Use Mixed En/Ch.
         """
-        response = model.generate_content(prompt)
-        return response.text
+        # Not cached: clicking again should give a fresh recommendation
+        yield from get_llm(api_key).generate_stream(get_generative_model_name(api_key), prompt, cache=False)
     except Exception as e:
-        return f"Error: {e}"
+        yield f"Error: {e}"
+
+CARD_SECTIONS = ("header", "suitability", "strategy", "deep_dive", "audit")
+
+# Card section filled by each top-level key of the analysis JSON
+SECTION_FOR_KEY = {
+    "data_source": "header",
+    "suitability": "suitability",
+    "strategic_planning": "strategy",
+    "opportunity_cost": "strategy",
+    "deep_dive": "deep_dive",
+    "contradiction_audit": "audit",
+}
+
+def create_card_slots(course_obj):
+    """
+    One placeholder per card section, so sections can be filled in as they stream in.
+    """
+    slots = {section: st.empty() for section in CARD_SECTIONS}
+    render_card_section(slots, course_obj, "header", {})
+    return slots
+
+def render_card_section(slots, course_obj, section, data):
+    """
+    (Re)draws one card section from the analysis data received so far.
+    """
+    slot = slots[section]
+    if section == "header":
+        source_badge = data.get('data_source', '…')
+        source_color = "#48bb78" if "RMP" in source_badge else "#ecc94b" if "Reddit" in source_badge else "#a0aec0"
+        slot.markdown(f"""
+        <div class="glass-card">
+            <div style="display:flex; justify-content:space-between; align_items:center;">
+                <h3 class="highlight-text" style="margin:0;">📘 {course_obj['code']}</h3>
+                <span style="background-color:{source_color}; color:white; padding:4px 8px; border-radius:12px; font-size:0.8em;">{source_badge}</span>
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+
+    # 1. Suitability & Risks
+    elif section == "suitability":
+        suit = data.get("suitability", {})
+        if suit:
+            with slot.container():
+                c1, c2, c3 = st.columns(3)
+                with c1:
+                    st.markdown("**✅ Best For**")
+                    for i in suit.get('best_for', []): st.markdown(f"- {i}")
+                with c2:
+                    st.markdown("**❌ Not For**")
+                    for i in suit.get('not_for', []): st.markdown(f"- {i}")
+                with c3:
+                    st.markdown("**⚠️ Risks**")
+                    for i in suit.get('risk_factors', []): st.markdown(f"- {i}")
+                st.divider()
+
+    # 2. Strategic Context & Opportunity Cost
+    elif section == "strategy":
+        strat = data.get("strategic_planning", {})
+        opp = data.get("opportunity_cost", {})
+        if strat or opp:
+            with slot.container():
+                st.markdown("#### 🧭 Strategic Context")
+                sc1, sc2 = st.columns(2)
+                with sc1:
+                    st.info(f"**Roadmap**: {strat.get('roadmap_context', 'N/A')}")
+                    st.caption(f"💡 {strat.get('credit_advice', '')}")
+                with sc2:
+                    st.warning(f"**📉 Opportunity Cost**: {opp.get('trade_offs', 'N/A')}")
+                    if opp.get('warning'):
+                        st.error(f"🚨 {opp.get('warning')}")
+
+    # 3. Deep Dive
+    elif section == "deep_dive":
+        dd = data.get("deep_dive", {})
+        with slot.container():
+            with st.expander("🧐 Deep Dive (深度测评)", expanded=True):
+                # Details Grid
+                c1, c2 = st.columns(2)
+                with c1:
+                    st.markdown(f"**📚 Workload**: {dd.get('workload', 'N/A')}")
+                    st.markdown(f"**⚖️ Grading**: {dd.get('grading', 'N/A')}")
+                    st.markdown(f"**🎓 Teaching**: {dd.get('teaching', 'N/A')}")
+                with c2:
+                    st.markdown(f"**📝 Exams**: {dd.get('exams', 'N/A')}")
+                    st.markdown(f"**💻 Projects**: {dd.get('projects', 'N/A')}")
+                    st.markdown(f"**💼 Industry**: {dd.get('industry_relevance', 'N/A')}")
+
+    # 4. Contradiction Audit
+    elif section == "audit":
+        audit = data.get("contradiction_audit", {})
+        if audit.get("flag"):
+            slot.error(f"🕵️ **Logic Audit**: {audit.get('details')}")
+
+def render_analysis_card(course_obj, result_json, slots=None):
+    """
+    Renders one analysis result (JSON string from analyze_course_with_tavily) as a course card.
+    Pass the slots from create_card_slots() to finish a card that was filled while streaming.
+    """
+    try:
+        data = json.loads(result_json)
+    except json.JSONDecodeError:
+        # Fallback for raw text (if model failed JSON mode)
+        data = None
+
+    if data is None or "error" in data:
+        target = st
+        if slots:
+            for section in CARD_SECTIONS[1:]:
+                slots[section].empty()
+            target = slots["header"]
+        if data is None:
+            target.markdown(f"""<div class="glass-card"><h3 class="highlight-text">📘 {course_obj['code']}</h3>{result_json}</div>""", unsafe_allow_html=True)
+        else:
+            target.error(f"Analysis Error: {data['error']}")
+        return
+
+    slots = slots or create_card_slots(course_obj)
+    for section in CARD_SECTIONS:
+        render_card_section(slots, course_obj, section, data)
 
 # --- UI Logic ---
 
@@ -369,6 +532,8 @@ if not st.session_state['profile_confirmed']:
                     "school": school, "major": major, "year": year, "transcript": transcript, "goal": "Job Seeking", "avoid": []
                 }
                 st.session_state['profile_confirmed'] = True
+                # Start the requirements search now, so it is done by the time courses are parsed
+                get_requirements_store().refresh_in_background([(school, major)], os.getenv("TAVILY_API_KEY"), os.getenv("GOOGLE_API_KEY"))
                 st.rerun()
             else:
                 st.error("Please fill in School and Major!")
@@ -407,6 +572,10 @@ else:
         if avoid_math: st.session_state['user_profile']['avoid'].append("heavy math")
         if avoid_essay: st.session_state['user_profile']['avoid'].append("heavy writing")
         
+        with st.expander("📈 API Throttle", expanded=False):
+            # Process-wide: waiting = queue depth behind the rate limiter
+            st.json(limiter_stats())
+        
     # Main Content
     st.markdown("""
     <div class="glass-card">
@@ -422,34 +591,50 @@ else:
     # Step 1: Paste
     st.markdown("### 1️⃣ Upload Flight Data (上传选课数据)")
     raw_text = st.text_area("", height=150, placeholder="Paste your course list here (Ctrl+V)...")
+    screenshots = st.file_uploader("...or upload Albert screenshots (可上传多张截图)", type=["png", "jpg", "jpeg"], accept_multiple_files=True)
     
     if st.button("🔍 Parse Data (解析数据)"):
-        if raw_text:
+        if raw_text or screenshots:
             with st.spinner("🤖 Decoding messy text..."):
-                parsed = parse_raw_text_with_gemini(raw_text, google_api_key)
+                # Course table fills in as each chunk / page comes back
+                preview = st.empty()
+                def _show_progress(courses_so_far, done, total, unit="chunks"):
+                    with preview.container():
+                        st.caption(f"Parsed {done}/{total} {unit} · {len(courses_so_far)} courses so far")
+                        if courses_so_far:
+                            st.dataframe(pd.DataFrame(courses_so_far)[['code', 'name', 'professor']], use_container_width=True, hide_index=True)
+                parsed = parse_raw_text_with_gemini(raw_text, google_api_key, on_chunk=_show_progress) if raw_text else []
+                if screenshots:
+                    parsed = merge_courses([parsed or [], extract_courses_from_screenshots(screenshots, _show_progress)])
+                preview.empty()
+                suggestions = {}
+                for course in parsed or []:
+                    course['professor'] = clean_professor_name(course['professor'])
+                    suggestion = suggest_professor_name(course['professor'])
+                    if suggestion:
+                        suggestions[course['professor']] = suggestion
+                st.session_state['name_suggestions'] = suggestions
                 
                 # --- Web-Augmented Parsing (Self-Correction) ---
                 if parsed and tavily_api_key:
                     try:
-                        tavily = TavilyClient(api_key=tavily_api_key)
+                        tavily = get_search_client(tavily_api_key)
                         for course in parsed:
                             # If info is missing, search the web
                             if course['professor'] == "TBD" or course['professor'] == "Staff" or len(course['name']) < 5:
                                 st.toast(f"🌍 Searching web for {course['code']}...", icon="🔍")
                                 q = f"NYU Tandon {course['code']} official course catalog syllabus instructor"
-                                res = tavily.search(q, max_results=2)
+                                res = tavily.search(q, max_results=2, source="catalog")
                                 context = "\n".join([r['content'] for r in res['results']])
                                 
                                 # Quick Re-Parse using Gemini
-                                fix_model = get_generative_model(google_api_key)
                                 fix_prompt = f"""
                                 Based on this search result, find the Professor and Course Name for {course['code']}.
                                 If multiple professors, pick the most recent one.
                                 Output JSON: {{ "name": "...", "professor": "..." }}
                                 Context: {context}
                                 """
-                                fix_resp = fix_model.generate_content(fix_prompt)
-                                fixed_data = extract_json_from_text(fix_resp.text)
+                                fixed_data = extract_json_from_text(generate_text(google_api_key, fix_prompt))
                                 
                                 if fixed_data:
                                     if isinstance(fixed_data, list) and len(fixed_data) > 0: fixed_data = fixed_data[0]
@@ -464,14 +649,29 @@ else:
 
                 if parsed:
                     st.session_state['courses'] = parsed
-                    st.success(f"✅ Found {len(parsed)} courses!")
+                    n_local = sum(1 for c in parsed if c.get('parse_path') == "local")
+                    st.success(f"✅ Found {len(parsed)} courses! ({n_local} parsed locally, {len(parsed) - n_local} via AI)")
 
     # Step 2: Analyze
     if 'courses' in st.session_state and st.session_state['courses']:
         st.markdown("### 2️⃣ Select Targets & Analyze")
         
+        # Likely typos of known instructors; applied (and remembered) only once accepted
+        suggestions = st.session_state.get('name_suggestions', {})
+        for typed, known in list(suggestions.items()):
+            c1, c2, c3 = st.columns([4, 1, 1])
+            c1.info(f"🔤 Did you mean **{known}** instead of **{typed}**?")
+            if c2.button("✅ Accept", key=f"accept_name_{typed}"):
+                get_name_resolver().learn(typed, known)
+                st.session_state['courses'] = [dict(c, professor=known) if c['professor'] == typed else c for c in st.session_state['courses']]
+                del suggestions[typed]
+                st.rerun()
+            if c3.button("✖️ Keep", key=f"keep_name_{typed}"):
+                del suggestions[typed]
+                st.rerun()
+
         # TBD Warning
-        tbd_courses = [c['code'] for c in st.session_state['courses'] if c['professor'] == "TBD"]
+        tbd_courses = [r.course_id for r in get_session_catalog().tbd()]
         if tbd_courses:
             st.warning(f"⚠️ TBD Professors detected: {', '.join(tbd_courses)}")
         
@@ -483,20 +683,21 @@ else:
             hide_index=True
         )
         
-        course_options = [f"{c['code']} | {c['professor']}" for c in st.session_state['courses']]
+        # Label -> course (first match wins, as list.index() did)
+        course_by_option = {}
+        for c in st.session_state['courses']:
+            course_by_option.setdefault(f"{c['code']} | {c['professor']}", c)
+        course_options = list(course_by_option)
         selected = st.multiselect("Select Courses (可多选):", course_options)
         
-        # Fetch Requirements Logic
-        if 'req_context' not in st.session_state:
-            if st.session_state['user_profile'].get('school') != "Unknown":
-                with st.spinner("📜 Fetching degree requirements..."):
-                    st.session_state['req_context'] = fetch_degree_requirements(
-                        st.session_state['user_profile']['school'], 
-                        st.session_state['user_profile']['major'], 
-                        tavily_api_key
-                    )
-            else:
-                st.session_state['req_context'] = "No requirements fetched (School Unknown)."
+        # Fetch Requirements Logic (re-fetched when the profile's program changes)
+        program = (st.session_state['user_profile'].get('school'), st.session_state['user_profile'].get('major'))
+        if st.session_state.get('req_program') != program:
+            with st.spinner("📜 Fetching degree requirements..."):
+                st.session_state['req_context'] = fetch_degree_requirements(program[0], program[1], tavily_api_key)
+            # A failed fetch is retried on the next rerun
+            if st.session_state['req_context'] != FETCH_FAILED:
+                st.session_state['req_program'] = program
 
         if selected:
             # --- Smart Input Reset ---
@@ -509,92 +710,82 @@ else:
                 st.session_state['last_selected'] = selected
             
             user_req = st.text_input("Specific Questions (Optional):", value="Workload? Grading?", key="user_req_input")
-            if st.button("🚀 Launch Analysis"):
-                if not tavily_api_key:
-                    st.error("Tavily API Key required!")
-                else:
-                    st.markdown("---")
-                    for item in selected:
-                        idx = course_options.index(item)
-                        course_obj = st.session_state['courses'][idx]
-                        
-                        with st.status(f"🕵️ Analyzing {course_obj['code']}...", expanded=True) as status:
-                            result_json = analyze_course_with_tavily(course_obj, user_req, st.session_state['user_profile'], st.session_state['req_context'], tavily_api_key, google_api_key, status_container=status)
-                            status.update(label=f"✅ {course_obj['code']} Ready", state="complete", expanded=False)
-                        
-                        try:
-                            data = json.loads(result_json)
-                            if "error" in data:
-                                st.error(f"Analysis Error: {data['error']}")
-                            else:
-                                # --- Render Structured UI ---
-                                # --- Render Structured UI ---
-                                source_badge = data.get('data_source', 'Unknown')
-                                source_color = "#48bb78" if "RMP" in source_badge else "#ecc94b" if "Reddit" in source_badge else "#a0aec0"
-                                
-                                st.markdown(f"""
-                                <div class="glass-card">
-                                    <div style="display:flex; justify-content:space-between; align_items:center;">
-                                        <h3 class="highlight-text" style="margin:0;">📘 {course_obj['code']}</h3>
-                                        <span style="background-color:{source_color}; color:white; padding:4px 8px; border-radius:12px; font-size:0.8em;">{source_badge}</span>
-                                    </div>
-                                """, unsafe_allow_html=True)
-                                
-                                # 1. Suitability & Risks
-                                suit = data.get("suitability", {})
-                                if suit:
-                                    c1, c2, c3 = st.columns(3)
-                                    with c1:
-                                        st.markdown("**✅ Best For**")
-                                        for i in suit.get('best_for', []): st.markdown(f"- {i}")
-                                    with c2:
-                                        st.markdown("**❌ Not For**")
-                                        for i in suit.get('not_for', []): st.markdown(f"- {i}")
-                                    with c3:
-                                        st.markdown("**⚠️ Risks**")
-                                        for i in suit.get('risk_factors', []): st.markdown(f"- {i}")
-                                    st.divider()
-
-                                # 2. Strategic Context & Opportunity Cost
-                                strat = data.get("strategic_planning", {})
-                                opp = data.get("opportunity_cost", {})
-                                
-                                if strat or opp:
-                                    st.markdown("#### 🧭 Strategic Context")
-                                    sc1, sc2 = st.columns(2)
-                                    with sc1:
-                                        st.info(f"**Roadmap**: {strat.get('roadmap_context', 'N/A')}")
-                                        st.caption(f"💡 {strat.get('credit_advice', '')}")
-                                    with sc2:
-                                        st.warning(f"**📉 Opportunity Cost**: {opp.get('trade_offs', 'N/A')}")
-                                        if opp.get('warning'):
-                                            st.error(f"🚨 {opp.get('warning')}")
-
-                                # 3. Deep Dive
-                                with st.expander("🧐 Deep Dive (深度测评)", expanded=True):
-                                    dd = data.get("deep_dive", {})
-                                    
-                                    # Details Grid
-                                    c1, c2 = st.columns(2)
-                                    with c1:
-                                        st.markdown(f"**📚 Workload**: {dd.get('workload', 'N/A')}")
-                                        st.markdown(f"**⚖️ Grading**: {dd.get('grading', 'N/A')}")
-                                        st.markdown(f"**🎓 Teaching**: {dd.get('teaching', 'N/A')}")
-                                    with c2:
-                                        st.markdown(f"**📝 Exams**: {dd.get('exams', 'N/A')}")
-                                        st.markdown(f"**💻 Projects**: {dd.get('projects', 'N/A')}")
-                                        st.markdown(f"**💼 Industry**: {dd.get('industry_relevance', 'N/A')}")
-
-                                # 4. Contradiction Audit
-                                audit = data.get("contradiction_audit", {})
-                                if audit.get("flag"):
-                                    st.error(f"🕵️ **Logic Audit**: {audit.get('details')}")
-                                
-                                st.markdown("</div>", unsafe_allow_html=True)
+            launch = st.button("🚀 Launch Analysis")
+            force_refresh = st.checkbox("🔄 Re-analyze (ignore saved results)", value=False)
+
+            targets = [course_by_option[item] for item in selected]
+            profile_snapshot = dict(st.session_state['user_profile'])
+            req_snapshot = st.session_state['req_context']
+            # Analyses made without requirements are shown but not kept; they are redone once the fetch succeeds
+            keep_results = req_snapshot != FETCH_FAILED
+
+            # Finished analyses are kept per (course, professor, goal, requirements), so reruns
+            # and other sessions re-render them without any network call
+            store = get_analysis_store()
+            result_keys = [store.key(profile_snapshot.get('school'), c['code'], c['professor'], goal_name(profile_snapshot.get('goal')), req_snapshot) for c in targets]
+            if launch and force_refresh:
+                for key, c in zip(result_keys, targets):
+                    store.invalidate(key)
+                    get_digester(google_api_key).invalidate(c['code'], clean_professor_name(c['professor']), profile_snapshot.get('school'))
+            saved = [store.get(key) for key in result_keys]
+
+            if launch and not tavily_api_key:
+                st.error("Tavily API Key required!")
+                launch = False
+            pending = [i for i, result in enumerate(saved) if result is None] if launch else []
+
+            if pending or any(result is not None for result in saved):
+                st.markdown("---")
+
+                # One placeholder per course, in selection order; cards fill in section by section.
+                slots = {}
+                for i, course_obj in enumerate(targets):
+                    slot = st.container()
+                    if saved[i] is not None:
+                        with slot:
+                            render_analysis_card(course_obj, saved[i])
+                    elif i in pending:
+                        slots[i] = (slot, slot.status(f"🕵️ Analyzing {course_obj['code']}...", expanded=True))
+                cards = {i: None for i in pending}
+                partial = {i: {} for i in pending}
+
+                def _analyze(course_obj, status):
+                    return analyze_course_with_tavily(
+                        course_obj, user_req, profile_snapshot, req_snapshot, tavily_api_key, google_api_key,
+                        status_container=status, on_section=lambda key, value: status.send("section", (key, value)),
+                        on_view=lambda goal, result: status.send("view", (goal, result))
+                    )
 
-                        except json.JSONDecodeError:
-                            # Fallback for raw text (if model failed JSON mode)
-                            st.markdown(f"""<div class="glass-card"><h3 class="highlight-text">📘 {course_obj['code']}</h3>{result_json}</div>""", unsafe_allow_html=True)
+                for event, idx, payload in run_concurrently([targets[i] for i in pending], _analyze):
+                    i = pending[idx]
+                    slot, status = slots[i]
+                    course_obj = targets[i]
+                    if event == "status":
+                        status.write(payload)
+                        continue
+                    if event == "view":
+                        # Advice for another goal, rendered in the same call: ready when the sidebar goal changes
+                        goal, result = payload
+                        if keep_results:
+                            store.put(store.key(profile_snapshot.get('school'), course_obj['code'], course_obj['professor'], goal, req_snapshot), result)
+                        continue
+                    if event == "section":
+                        key, value = payload
+                        if key in SECTION_FOR_KEY:
+                            if cards[i] is None:
+                                status.update(label=f"✍️ Writing {course_obj['code']}...", expanded=False)
+                                with slot:
+                                    cards[i] = create_card_slots(course_obj)
+                            partial[i][key] = value
+                            render_card_section(cards[i], course_obj, SECTION_FOR_KEY[key], partial[i])
+                        continue
+                    if event == "error":
+                        payload = json.dumps({"error": str(payload)})
+                    elif keep_results:
+                        store.put(result_keys[i], payload)
+                    status.update(label=f"✅ {course_obj['code']} Ready", state="complete", expanded=False)
+                    with slot:
+                        render_analysis_card(course_obj, payload, cards[i])
 
         # Step 3: Recommend
         st.markdown("### 3️⃣ Strategic Planning (排课推荐)")
@@ -602,6 +793,11 @@ else:
             if not tavily_api_key:
                 st.error("Tavily API Key required!")
             else:
-                with st.spinner("🧠 Computing optimal paths..."):
-                    rec_result = generate_schedule_recommendations(st.session_state['courses'], st.session_state['user_profile'], st.session_state['req_context'], google_api_key)
-                    st.markdown(f"""<div class="glass-card" style="border-left: 5px solid #48bb78;"><h3>🧠 AI Schedule Recommendation</h3>{rec_result}</div>""", unsafe_allow_html=True)
+                # Render the recommendation as it streams in instead of waiting for the whole answer
+                rec_slot = st.empty()
+                rec_slot.markdown("🧠 Computing optimal paths...")
+                rec_result = ""
+                for chunk in stream_schedule_recommendations(st.session_state['courses'], st.session_state['user_profile'], st.session_state['req_context'], google_api_key):
+                    rec_result += chunk
+                    rec_slot.markdown(f"""<div class="glass-card" style="border-left: 5px solid #48bb78;"><h3>🧠 AI Schedule Recommendation</h3>{rec_result}▌</div>""", unsafe_allow_html=True)
+                rec_slot.markdown(f"""<div class="glass-card" style="border-left: 5px solid #48bb78;"><h3>🧠 AI Schedule Recommendation</h3>{rec_result}</div>""", unsafe_allow_html=True)
@@ -0,0 +1,184 @@
+import math
+import os
+import re
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+
+
+class EmbeddingBackend(ABC):
+    """
+    Turns texts into vectors. The backend name and config are stored with the collection
+    so the index and later queries are always embedded the same way.
+    """
+    name = "base"
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        pass
+
+    def config(self) -> Dict[str, Any]:
+        return {"embedding_backend": self.name}
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        # Lets a backend be used wherever Chroma expects an embedding function
+        return self.embed(list(input))
+
+
+class GoogleEmbeddingBackend(EmbeddingBackend):
+    """
+    Remote Gemini embeddings (text-embedding-004). Needs GOOGLE_API_KEY and network access.
+    """
+    name = "google"
+
+    def __init__(self, api_key: Optional[str] = None, model_name: str = "models/text-embedding-004"):
+        from chromadb.utils import embedding_functions
+
+        api_key = api_key or os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise ValueError("GOOGLE_API_KEY not found in environment variables")
+        self.model_name = model_name
+        self._fn = embedding_functions.GoogleGenerativeAiEmbeddingFunction(api_key=api_key, model_name=model_name)
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return [list(e) for e in self._fn(texts)]
+
+    def config(self) -> Dict[str, Any]:
+        return {"embedding_backend": self.name, "embedding_model": self.model_name}
+
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """
+    Local, dependency-free feature hashing over words and character trigrams.
+    Deterministic across processes (crc32, not hash()), so the index can be reused offline.
+    """
+    name = "hashing"
+    TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        words = self.TOKEN_RE.findall(text.lower())
+        features = list(words)
+        features.extend(f"{a} {b}" for a, b in zip(words, words[1:]))
+        for word in words:
+            padded = f"#{word}#"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return features
+
+    def embed_one(self, text: str) -> List[float]:
+        counts: Dict[int, float] = {}
+        for feature in self._features(text):
+            h = zlib.crc32(feature.encode("utf-8"))
+            index = h % self.dim
+            sign = 1.0 if (h >> 31) & 1 else -1.0
+            counts[index] = counts.get(index, 0.0) + sign
+
+        vector = [0.0] * self.dim
+        for index, value in counts.items():
+            # Sublinear term frequency keeps long descriptions from dominating
+            vector[index] = math.copysign(1.0 + math.log(abs(value)), value) if value else 0.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_one(t) for t in texts]
+
+    def config(self) -> Dict[str, Any]:
+        return {"embedding_backend": self.name, "embedding_dim": self.dim}
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """
+    Local CPU model via sentence-transformers (optional dependency).
+    """
+    name = "sentence-transformer"
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ImportError("sentence-transformers is not installed. Run `pip install sentence-transformers` or use the 'hashing' backend.")
+        self.model_name = model_name
+        self._model = SentenceTransformer(model_name, device="cpu")
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return self._model.encode(texts, normalize_embeddings=True).tolist()
+
+    def config(self) -> Dict[str, Any]:
+        return {"embedding_backend": self.name, "embedding_model": self.model_name}
+
+
+BACKENDS = {
+    GoogleEmbeddingBackend.name: GoogleEmbeddingBackend,
+    HashingEmbeddingBackend.name: HashingEmbeddingBackend,
+    SentenceTransformerBackend.name: SentenceTransformerBackend,
+}
+
+
+def default_backend_name() -> str:
+    """
+    EMBEDDING_BACKEND if set, otherwise Google when a key is available and local hashing when not.
+    """
+    configured = os.getenv("EMBEDDING_BACKEND")
+    if configured:
+        return configured
+    return GoogleEmbeddingBackend.name if os.getenv("GOOGLE_API_KEY") else HashingEmbeddingBackend.name
+
+
+def create_backend(name: str, config: Optional[Dict[str, Any]] = None) -> EmbeddingBackend:
+    """
+    Builds a backend by name, restoring its settings from stored collection metadata if given.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    config = config or {}
+    if name == HashingEmbeddingBackend.name and config.get("embedding_dim"):
+        return HashingEmbeddingBackend(dim=int(config["embedding_dim"]))
+    if config.get("embedding_model") and name != HashingEmbeddingBackend.name:
+        return BACKENDS[name](model_name=config["embedding_model"])
+    return BACKENDS[name]()
+
+
+class QueryEmbeddingCache:
+    """
+    Small LRU in front of a backend for repeated query strings.
+    `embed` overrides how misses are embedded (e.g. through the rate limiter).
+    """
+    def __init__(self, backend: EmbeddingBackend, max_size: int = QUERY_CACHE_SIZE, embed: Optional[Callable[[List[str]], List[List[float]]]] = None):
+        self.backend = backend
+        self.embed = embed or backend.embed
+        self.max_size = max_size
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """
+        Embeds all cache misses in one backend call.
+        """
+        keys = [" ".join(q.lower().split()) for q in queries]
+        with self._lock:
+            missing = [k for k in dict.fromkeys(keys) if k not in self._cache]
+        if missing:
+            vectors = self.embed(missing)
+            with self._lock:
+                for key, vector in zip(missing, vectors):
+                    self._cache[key] = vector
+                while len(self._cache) > self.max_size:
+                    self._cache.popitem(last=False)
+
+        results = []
+        with self._lock:
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    results.append(self._cache[key])
+                else:
+                    # Evicted by a concurrent caller; embed again
+                    results.append(None)
+        return [r if r is not None else self.embed([k])[0] for r, k in zip(results, keys)]
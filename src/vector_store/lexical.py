@@ -0,0 +1,114 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.engine.local_parser import COURSE_CODE_RE
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Field weights: an exact course code or instructor hit matters more than a title word
+FIELD_WEIGHTS = {"course_id": 3, "instructor": 2, "name": 1}
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase word tokens plus one compact token per course code ("CS-GY 6083" -> "csgy6083"),
+    so codes match exactly regardless of spacing and dashes.
+    """
+    text = text or ""
+    tokens = TOKEN_RE.findall(text.lower())
+    for dept, school, number in COURSE_CODE_RE.findall(text.upper()):
+        tokens.append(f"{dept}{school}{number}".lower())
+    return tokens
+
+
+def matches_filters(metadata: Dict[str, Any], filters: Optional[Dict[str, Any]]) -> bool:
+    """
+    Python-side twin of build_where(), used for candidates that don't come from Chroma.
+    """
+    if not filters:
+        return True
+    for key in ("school", "term", "instruction_mode"):
+        if filters.get(key) is not None and metadata.get(key) != filters[key]:
+            return False
+    if filters.get("units") is not None and metadata.get("units") != float(filters["units"]):
+        return False
+    if filters.get("min_rating") is not None and (metadata.get("rating") or 0.0) < float(filters["min_rating"]):
+        return False
+    return True
+
+
+def build_where(filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Turns {"school", "term", "instruction_mode", "units", "min_rating"} filters into a Chroma where clause.
+    """
+    if not filters:
+        return None
+    clauses = []
+    for key in ("school", "term", "instruction_mode"):
+        if filters.get(key) is not None:
+            clauses.append({key: {"$eq": filters[key]}})
+    if filters.get("units") is not None:
+        clauses.append({"units": {"$eq": float(filters["units"])}})
+    if filters.get("min_rating") is not None:
+        clauses.append({"rating": {"$gte": float(filters["min_rating"])}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+class BM25Index:
+    """
+    Inverted index with BM25 scoring over course code, name and instructor.
+    """
+    def __init__(self, ids: List[str], metadatas: List[Dict[str, Any]], documents: List[str], k1: float = 1.5, b: float = 0.75):
+        self.ids = ids
+        self.metadatas = metadatas
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.doc_lengths: List[int] = []
+
+        for doc_index, metadata in enumerate(metadatas):
+            counts = Counter()
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in tokenize(str((metadata or {}).get(field, ""))):
+                    counts[token] += weight
+            for token, tf in counts.items():
+                self.postings[token].append((doc_index, tf))
+            self.doc_lengths.append(sum(counts.values()))
+
+        self.avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+
+    def search(self, query: str, n_results: int = 10, filters: Optional[Dict[str, Any]] = None) -> List[Tuple[int, float]]:
+        """
+        Returns (doc_index, score) pairs, best first.
+        """
+        n_docs = len(self.doc_lengths)
+        scores: Dict[int, float] = defaultdict(float)
+        for token in set(tokenize(query)):
+            postings = self.postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_index, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_index] / (self.avg_length or 1.0))
+                scores[doc_index] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if filters:
+            ranked = [(i, s) for i, s in ranked if matches_filters(self.metadatas[i], filters)]
+        return ranked[:n_results]
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Fuses several ranked id lists: score(id) = sum over lists of 1 / (k + rank).
+    """
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] += 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
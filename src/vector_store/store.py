@@ -1,65 +1,219 @@
 import os
+import threading
 import chromadb
-from chromadb.utils import embedding_functions
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
+from src.data.processor import content_hash
+from src.engine.concurrency import is_transient_error, rate_limited_call, run_concurrently
+from src.vector_store.embeddings import QueryEmbeddingCache, create_backend, default_backend_name
+from src.vector_store.lexical import BM25Index, build_where, reciprocal_rank_fusion
 
 load_dotenv()
 
+# Google's embedding API accepts at most 100 texts per request
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "100"))
+EMBED_MAX_WORKERS = int(os.getenv("EMBED_MAX_WORKERS", "4"))
+
+
 class CourseVectorStore:
-    def __init__(self, persist_directory: str = "./chroma_db"):
+    def __init__(self, persist_directory: str = "./chroma_db", embedding_backend: Optional[str] = None):
         self.client = chromadb.PersistentClient(path=persist_directory)
-        
-        # Use Google Generative AI Embeddings
-        # We use the direct google.generativeai embedding function provided by Chroma or a custom one if needed.
-        # For simplicity and to match our successful direct API usage, let's use the default google ef if available,
-        # or build a simple wrapper around genai.embed_content.
-        
-        google_api_key = os.getenv("GOOGLE_API_KEY")
-        if not google_api_key:
-            raise ValueError("GOOGLE_API_KEY not found in environment variables")
-
-        self.embedding_fn = embedding_functions.GoogleGenerativeAiEmbeddingFunction(
-            api_key=google_api_key,
-            model_name="models/text-embedding-004"
-        )
-        
+
+        # The embedding backend is recorded in the collection metadata. Each backend gets its
+        # own collection ("courses" for Google, "courses_<backend>" otherwise), so an index is
+        # always queried with the same embeddings it was built with.
+        # EMBEDDING_BACKEND=hashing (or no GOOGLE_API_KEY) gives a fully offline store.
+        backend_name = embedding_backend or default_backend_name()
+        collection_name = "courses" if backend_name == "google" else f"courses_{backend_name}"
+
+        stored_config = self._stored_config(collection_name)
+        self.embedding_fn = create_backend(backend_name, stored_config)
+        self.query_cache = QueryEmbeddingCache(self.embedding_fn, embed=self._embed)
+
+        # Embeddings are always computed by us, never by Chroma
         self.collection = self.client.get_or_create_collection(
-            name="courses",
-            embedding_function=self.embedding_fn
+            name=collection_name,
+            metadata=self.embedding_fn.config(),
+            embedding_function=None
         )
+        if not stored_config:
+            self.collection.modify(metadata=self.embedding_fn.config())
+
+        # BM25 index over code / name / instructor, built lazily on first hybrid search
+        self._lexical_index: Optional[BM25Index] = None
+        self._lexical_lock = threading.Lock()
+        self._legacy_ids_checked = False
 
-    def add_courses(self, documents: List[str], metadatas: List[Dict[str, Any]], ids: List[str]):
+    def _stored_config(self, collection_name: str) -> Dict[str, Any]:
+        try:
+            metadata = self.client.get_collection(collection_name, embedding_function=None).metadata or {}
+        except Exception:
+            return {}
+        return metadata if metadata.get("embedding_backend") else {}
+
+    def _drop_legacy_ids(self) -> int:
         """
-        Adds course documents to the vector store.
+        Rows used to be keyed by course_id alone; they are keyed by "course_id|term" now.
+        Old rows would otherwise stay next to their re-ingested copies and show up twice in search.
         """
-        self.collection.add(
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids
-        )
-        print(f"✅ Added {len(documents)} courses to ChromaDB.")
+        legacy = [i for i in self.collection.get(include=[])["ids"] if "|" not in i]
+        for start in range(0, len(legacy), EMBED_BATCH_SIZE):
+            self.collection.delete(ids=legacy[start:start + EMBED_BATCH_SIZE])
+        if legacy:
+            self._lexical_index = None
+            print(f"🧹 Removed {len(legacy)} rows with pre-term ids from ChromaDB.")
+        return len(legacy)
+
+    def add_courses(self, documents: List[str], metadatas: List[Dict[str, Any]], ids: List[str], batch_size: int = EMBED_BATCH_SIZE, max_workers: int = EMBED_MAX_WORKERS) -> Dict[str, int]:
+        """
+        Upserts course documents into the vector store.
+        Each document gets a content hash in its metadata (DocumentProcessor already adds
+        one; it is computed here otherwise); rows whose hash is unchanged
+        are skipped, so re-ingesting a catalog only embeds what actually changed.
+        Embedding runs in concurrent batches through the shared rate limiter.
+        """
+        # Last occurrence wins if the same id shows up twice
+        rows = {}
+        for doc, meta, doc_id in zip(documents, metadatas, ids):
+            meta = dict(meta)
+            meta["content_hash"] = meta.get("content_hash") or content_hash(doc, meta)
+            rows[doc_id] = (doc, meta)
+        all_ids = list(rows.keys())
+
+        # Once per store, the first time new-style ids are written
+        if not self._legacy_ids_checked and any("|" in i for i in all_ids):
+            self._drop_legacy_ids()
+            self._legacy_ids_checked = True
+
+        # 1. Find rows that are new or changed
+        changed_ids = []
+        for start in range(0, len(all_ids), batch_size):
+            batch_ids = all_ids[start:start + batch_size]
+            existing = self.collection.get(ids=batch_ids, include=["metadatas"])
+            existing_hashes = {i: (m or {}).get("content_hash") for i, m in zip(existing["ids"], existing["metadatas"])}
+            changed_ids.extend(i for i in batch_ids if existing_hashes.get(i) != rows[i][1]["content_hash"])
 
-    def search_courses(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
+        # 2. Embed changed rows concurrently, upsert each batch as it comes back
+        batches = [changed_ids[i:i + batch_size] for i in range(0, len(changed_ids), batch_size)]
+        embed = lambda batch_ids, status: self._embed([rows[i][0] for i in batch_ids])
+        upserted = 0
+        failed = 0
+        for event, idx, payload in run_concurrently(batches, embed, max_workers=max_workers):
+            if event == "status":
+                continue
+            batch_ids = batches[idx]
+            if event == "error":
+                print(f"⚠️ Embedding batch failed ({len(batch_ids)} courses): {payload}")
+                failed += len(batch_ids)
+                continue
+            self.collection.upsert(
+                ids=batch_ids,
+                embeddings=payload,
+                documents=[rows[i][0] for i in batch_ids],
+                metadatas=[rows[i][1] for i in batch_ids]
+            )
+            upserted += len(batch_ids)
+
+        if upserted:
+            self._lexical_index = None
+
+        stats = {"upserted": upserted, "unchanged": len(all_ids) - len(changed_ids), "failed": failed}
+        print(f"✅ Upserted {upserted} courses to ChromaDB ({stats['unchanged']} unchanged, {failed} failed).")
+        return stats
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        # Remote embeddings share the Gemini quota; local backends need no throttling
+        if self.embedding_fn.name == "google":
+            # 5xx / timeouts are retried too, as the old per-batch backoff did
+            return rate_limited_call("gemini", lambda: self.embedding_fn.embed(texts), model=self.embedding_fn.model_name,
+                                     retry_on=is_transient_error)
+        return self.embedding_fn.embed(texts)
+
+    def _get_lexical_index(self) -> BM25Index:
+        with self._lexical_lock:
+            if self._lexical_index is None:
+                data = self.collection.get(include=["metadatas", "documents"])
+                self._lexical_index = BM25Index(data["ids"], data["metadatas"], data["documents"])
+            return self._lexical_index
+
+    def search_courses(self, query: str, n_results: int = 5, filters: Optional[Dict[str, Any]] = None, mode: str = "hybrid") -> List[Dict[str, Any]]:
         """
         Searches for relevant courses based on a query.
+        mode="hybrid" fuses BM25 over code/name/instructor with vector search (reciprocal rank fusion);
+        "vector" and "lexical" run one side only.
+        filters: optional {"school", "term", "instruction_mode", "units", "min_rating"}, pushed down
+        into the Chroma where clause.
         """
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=n_results
-        )
-        
-        # Chroma returns a dict of lists. We want to flatten it to a list of dicts for easier use.
-        # results['metadatas'][0] contains the metadata for the first query (we only have one).
-        if not results['metadatas']:
+        return self.search_courses_batch([query], n_results=n_results, filters=filters, mode=mode)[0]
+
+    def search_courses_batch(self, queries: List[str], n_results: int = 5, filters: Optional[Dict[str, Any]] = None, mode: str = "hybrid", dedup: bool = False) -> List[List[Dict[str, Any]]]:
+        """
+        Runs many queries at once: one embedding request for all (uncached) queries and one
+        Chroma query call. Returns one result list per query, in order.
+        dedup=True keeps each course only under the query where it scored best.
+        """
+        if not queries:
             return []
-            
-        flattened_results = []
-        for i, metadata in enumerate(results['metadatas'][0]):
-            flattened_results.append({
-                "metadata": metadata,
-                "document": results['documents'][0][i],
-                "distance": results['distances'][0][i] if results['distances'] else None
-            })
-            
-        return flattened_results
+        if self.collection.count() == 0:
+            return [[] for _ in queries]
+
+        candidates = max(n_results * 3, 20)
+        hits: Dict[str, Dict[str, Any]] = {}
+        rankings: List[List[List[str]]] = [[] for _ in queries]
+
+        if mode in ("hybrid", "vector"):
+            results = self.collection.query(
+                query_embeddings=self.query_cache.embed_queries(queries),
+                n_results=n_results if mode == "vector" else candidates,
+                where=build_where(filters)
+            )
+            # Chroma returns a dict of lists of lists: results[field][query_index][rank]
+            for q, ids in enumerate(results['ids'] or []):
+                ranking = []
+                for i, doc_id in enumerate(ids):
+                    hits[doc_id] = {
+                        "metadata": results['metadatas'][q][i],
+                        "document": results['documents'][q][i]
+                    }
+                    ranking.append(doc_id)
+                rankings[q].append(ranking)
+                distances = results['distances'][q] if results['distances'] else [None] * len(ids)
+                for doc_id, distance in zip(ids, distances):
+                    hits[doc_id].setdefault("distances", {})[q] = distance
+
+        if mode in ("hybrid", "lexical"):
+            index = self._get_lexical_index()
+            for q, query in enumerate(queries):
+                ranking = []
+                for doc_index, _ in index.search(query, n_results=candidates, filters=filters):
+                    doc_id = index.ids[doc_index]
+                    hits.setdefault(doc_id, {
+                        "metadata": index.metadatas[doc_index],
+                        "document": index.documents[doc_index]
+                    })
+                    ranking.append(doc_id)
+                rankings[q].append(ranking)
+
+        fused = [reciprocal_rank_fusion(r) for r in rankings]
+        if dedup:
+            best_query = {}
+            for q, ranked in enumerate(fused):
+                for doc_id, score in ranked:
+                    if doc_id not in best_query or score > best_query[doc_id][1]:
+                        best_query[doc_id] = (q, score)
+            fused = [[(d, s) for d, s in ranked if best_query[d][0] == q] for q, ranked in enumerate(fused)]
+
+        all_results = []
+        for q, ranked in enumerate(fused):
+            flattened_results = []
+            for doc_id, score in ranked[:n_results]:
+                hit = hits[doc_id]
+                flattened_results.append({
+                    "id": doc_id,
+                    "metadata": hit["metadata"],
+                    "document": hit["document"],
+                    "distance": hit.get("distances", {}).get(q),
+                    "score": score
+                })
+            all_results.append(flattened_results)
+        return all_results
@@ -7,16 +7,22 @@ def verify():
     print("🕵️ Verifying Vector Store...")
     store = CourseVectorStore()
     
-    query = "I want to learn about Artificial Intelligence and Neural Networks"
-    print(f"Query: '{query}'")
+    queries = [
+        "I want to learn about Artificial Intelligence and Neural Networks",
+        "CS-GY 6083",
+        "LeCun",
+    ]
     
-    results = store.search_courses(query, n_results=3)
+    # One embedding request and one Chroma query for all of them
+    all_results = store.search_courses_batch(queries, n_results=3)
     
-    print(f"\nFound {len(results)} results:")
-    for res in results:
-        meta = res['metadata']
-        print(f"- {meta['course_id']}: {meta['name']} (Instructor: {meta['instructor']})")
-        print(f"  Distance: {res['distance']}")
+    for query, results in zip(queries, all_results):
+        print(f"\nQuery: '{query}'")
+        print(f"Found {len(results)} results:")
+        for res in results:
+            meta = res['metadata']
+            print(f"- {meta['course_id']}: {meta['name']} (Instructor: {meta['instructor']})")
+            print(f"  Distance: {res['distance']}  Score: {res['score']:.4f}")
 
 if __name__ == "__main__":
     verify()